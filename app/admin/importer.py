@@ -0,0 +1,204 @@
+import codecs
+import csv
+import datetime
+import json
+import uuid
+from typing import Any, AsyncIterator, Literal
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.admin.models import UserImportReport, UserImportResult, UserImportRow
+from app.core import hashing
+from app.tasks.queue import enqueue_verification_emails
+from app.user.models import User
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# rows validated, hashed and inserted together, and one email task per batch
+IMPORT_BATCH_SIZE = 1000
+
+_COPY_COLUMNS = (
+    "id", "email", "hashed_password", "created_at", "updated_at",
+    "is_active", "is_verified", "is_superuser",
+)
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def _records(
+    chunks: AsyncIterator[bytes], format: ImportFormat
+) -> AsyncIterator[dict[str, Any] | str]:
+    """Raw rows of the upload, or an error message for rows that cannot be parsed."""
+    header: list[str] | None = None
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        if format == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield f"Invalid JSON: {e}"
+                continue
+            yield record if isinstance(record, dict) else "Expected a JSON object"
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            if not {"email", "password"} <= set(header):
+                raise HTTPException(
+                    status_code=400, detail="CSV header must contain email and password"
+                )
+            continue
+        yield dict(zip(header, values))
+
+
+async def _existing_emails(session: AsyncSession, emails: list[str]) -> set[str]:
+    if not emails:
+        return set()
+    statement = select(User.email).where(User.email.in_(emails))
+    return set((await session.exec(statement)).all())
+
+
+async def _copy_users(session: AsyncSession, users: list[dict[str, Any]]) -> None:
+    """Insert with COPY, psycopg's fastest path for many rows."""
+    connection = await session.connection()
+    raw = (await connection.get_raw_connection()).driver_connection
+    async with raw.cursor() as cursor:
+        async with cursor.copy(f"COPY users ({', '.join(_COPY_COLUMNS)}) FROM STDIN") as copy:
+            for user in users:
+                await copy.write_row([user[column] for column in _COPY_COLUMNS])
+
+
+async def _insert_users(session: AsyncSession, users: list[dict[str, Any]]) -> set[str]:
+    """Insert ``users`` in one transaction, returning the emails that already existed."""
+    from psycopg.errors import UniqueViolation
+
+    if session.bind.dialect.name != "postgresql":
+        await session.execute(insert(User), users)
+        await session.commit()
+        return set()
+    try:
+        await _copy_users(session, users)
+        await session.commit()
+        return set()
+    except UniqueViolation:
+        # someone registered one of these emails since we checked
+        await session.rollback()
+    statement = (
+        pg_insert(User)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.email)
+    )
+    inserted = set((await session.scalars(statement, users)).all())
+    await session.commit()
+    return {user["email"] for user in users} - inserted
+
+
+async def _import_batch(
+    session: AsyncSession,
+    batch: list[tuple[int, dict[str, Any] | str]],
+    seen: set[str],
+    report: UserImportReport,
+    send_verification: bool,
+) -> None:
+    results: dict[int, UserImportResult] = {}
+    valid: list[tuple[int, UserImportRow]] = []
+    for row, record in batch:
+        if isinstance(record, str):
+            results[row] = UserImportResult(row=row, status="invalid", detail=record)
+            continue
+        try:
+            user = UserImportRow.model_validate(record)
+        except ValidationError as e:
+            error = e.errors()[0]
+            results[row] = UserImportResult(
+                row=row,
+                email=str(record.get("email") or "") or None,
+                status="invalid",
+                detail=f"{'.'.join(map(str, error['loc']))}: {error['msg']}",
+            )
+            continue
+        if user.email in seen:
+            results[row] = UserImportResult(row=row, email=user.email, status="duplicate")
+            continue
+        seen.add(user.email)
+        valid.append((row, user))
+
+    existing = await _existing_emails(session, [user.email for _, user in valid])
+    new = [(row, user) for row, user in valid if user.email not in existing]
+    hashed_passwords = await hashing.hash_passwords([user.password for _, user in new])
+    now = datetime.datetime.now()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "email": user.email,
+            "hashed_password": hashed_password,
+            "created_at": now,
+            "updated_at": now,
+            "is_active": True,
+            "is_verified": False,
+            "is_superuser": False,
+        }
+        for (_, user), hashed_password in zip(new, hashed_passwords)
+    ]
+    if rows:
+        existing |= await _insert_users(session, rows)
+
+    created = []
+    for row, user in valid:
+        if user.email in existing:
+            results[row] = UserImportResult(row=row, email=user.email, status="exists")
+        else:
+            results[row] = UserImportResult(row=row, email=user.email, status="created")
+            created.append(user.email)
+    if send_verification:
+        await enqueue_verification_emails(emails=created)
+
+    report.created += len(created)
+    report.skipped += len(results) - len(created)
+    report.results.extend(results[row] for row in sorted(results))
+
+
+async def import_users(
+    *,
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    format: ImportFormat,
+    send_verification: bool = True,
+) -> UserImportReport:
+    """Create users from a streamed CSV or NDJSON upload of email and password.
+
+    The upload is consumed batch by batch: each batch is validated, checked
+    against existing emails in one query, hashed across all cores, inserted in
+    one transaction and gets one queued email task. Batches that were already
+    committed stay committed if a later one fails.
+    """
+    report = UserImportReport()
+    seen: set[str] = set()
+    batch: list[tuple[int, dict[str, Any] | str]] = []
+    row = 0
+    async for record in _records(chunks, format):
+        row += 1
+        batch.append((row, record))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _import_batch(session, batch, seen, report, send_verification)
+            batch = []
+    if batch:
+        await _import_batch(session, batch, seen, report, send_verification)
+    return report
@@ -0,0 +1,34 @@
+from typing import Literal
+
+from pydantic import EmailStr
+from sqlmodel import Field, SQLModel
+
+
+class UserImportRow(SQLModel):
+    email: EmailStr
+    password: str = Field(min_length=6, max_length=128)
+
+
+class UserImportResult(SQLModel):
+    row: int
+    email: str | None = None
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    detail: str | None = None
+
+
+class UserImportReport(SQLModel):
+    created: int = 0
+    skipped: int = 0
+    results: list[UserImportResult] = []
+
+
+class ProfilingUpdate(SQLModel):
+    sample_rate: float = Field(ge=0, le=1)
+    route: str | None = None  # route id, e.g. "user-get_current_user_data"; None samples every route
+    minutes: float | None = Field(default=None, gt=0, le=24 * 60)  # then back to PROFILE_SAMPLE_RATE
+
+
+class ProfileToken(SQLModel):
+    header: str
+    value: str
+    expires: int
@@ -0,0 +1,104 @@
+import time
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.admin import export, importer, service
+from app.admin.export import ExportFormat
+from app.admin.importer import ImportFormat
+from app.admin.models import ProfileToken, ProfilingUpdate, UserImportReport
+from app.admin.service import CountMode
+from app.core import profiling
+from app.core.config import settings
+from app.user.models import UserPublic
+from app.utils.deps import AsyncSessionDep, CurrentAdmin, ReadSessionDep
+from app.utils.paginator import CursorPage
+
+router = APIRouter(tags=["admin"])
+
+@router.get("/users", status_code=200, response_model=CursorPage[UserPublic])
+async def list_users(
+    current_user: CurrentAdmin,
+    session: ReadSessionDep,
+    cursor: str | None = None,
+    size: int = Query(default=50, ge=1, le=500),
+    count: CountMode = "none",
+) -> CursorPage[UserPublic]:
+    """List users with keyset pagination; pass next_cursor back to get the next page."""
+    return await service.list_users(session=session, cursor=cursor, size=size, count=count)
+
+@router.get("/users/export", status_code=200, response_class=StreamingResponse)
+async def export_users(
+    current_user: CurrentAdmin,
+    format: ExportFormat = "ndjson",
+    columns: list[str] | None = Query(default=None),
+) -> StreamingResponse:
+    """Stream every user as NDJSON or CSV, optionally limited to some columns."""
+    selected = export.export_columns(columns)
+    return StreamingResponse(
+        export.stream_users(columns=selected, format=format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+@router.post("/users/import", status_code=200, response_model=UserImportReport)
+async def import_users(
+    request: Request,
+    current_user: CurrentAdmin,
+    session: AsyncSessionDep,
+    format: ImportFormat = "csv",
+    send_verification: bool = True,
+) -> UserImportReport:
+    """Create users from a CSV (email,password header) or NDJSON request body."""
+    return await importer.import_users(
+        session=session,
+        chunks=request.stream(),
+        format=format,
+        send_verification=send_verification,
+    )
+
+@router.get("/profiling", status_code=200)
+async def profiling_state(current_user: CurrentAdmin) -> dict[str, Any]:
+    """Sampling state of the worker answering this request."""
+    return {"enabled": settings.PROFILING_ENABLED, **profiling.control.state()}
+
+@router.put("/profiling", status_code=200)
+async def update_profiling(current_user: CurrentAdmin, update: ProfilingUpdate) -> dict[str, Any]:
+    """Profile a share of requests, optionally one route for a few minutes, on every worker."""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=409, detail="Profiling is disabled")
+    until = time.time() + update.minutes * 60 if update.minutes else None
+    await profiling.publish_control({"sample_rate": update.sample_rate, "route": update.route, "until": until})
+    return profiling.control.state()
+
+@router.post("/profiling/token", status_code=200, response_model=ProfileToken)
+async def create_profile_token(
+    current_user: CurrentAdmin,
+    ttl_seconds: int = Query(default=300, ge=1, le=3600),
+) -> ProfileToken:
+    """Header that profiles any request carrying it until it expires."""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=409, detail="Profiling is disabled")
+    value, expires = profiling.sign_profile_token(ttl_seconds)
+    return ProfileToken(header=profiling.PROFILE_HEADER, value=value, expires=expires)
+
+@router.post("/profiling/memory", status_code=200)
+async def memory_snapshot(
+    current_user: CurrentAdmin,
+    top: int = Query(default=25, ge=1, le=200),
+) -> dict[str, Any]:
+    """Heap snapshot of this worker, diffed against its previous one.
+
+    The first call starts tracemalloc, which slows allocations until it is stopped.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=409, detail="Profiling is disabled")
+    return await run_in_threadpool(profiling.memory_tracker.snapshot, top)
+
+@router.delete("/profiling/memory", status_code=204)
+async def stop_memory_tracking(current_user: CurrentAdmin) -> None:
+    """Stop tracemalloc on this worker."""
+    # waits for a snapshot in progress
+    await run_in_threadpool(profiling.memory_tracker.stop)
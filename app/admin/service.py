@@ -0,0 +1,34 @@
+from typing import Literal
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.user.models import User, UserPublic
+from app.utils.paginator import CursorPage, CursorPaginator, estimated_count, exact_count
+
+CountMode = Literal["none", "estimated", "exact"]
+
+
+async def list_users(
+    *, session: AsyncSession, cursor: str | None, size: int, count: CountMode
+) -> CursorPage[UserPublic]:
+    """List users oldest first, one keyset page at a time."""
+    paginator = CursorPaginator(keys=(User.created_at, User.id), cursor=cursor, size=size)
+    rows = (await session.exec(paginator.apply(select(User)))).all()
+
+    total = None
+    total_is_estimate = False
+    if count == "estimated":
+        total = await estimated_count(session, User.__tablename__)
+        total_is_estimate = total is not None
+    if count == "exact" or (count == "estimated" and total is None):
+        total = await exact_count(session, select(User))
+
+    page = paginator.page(rows, total=total, total_is_estimate=total_is_estimate)
+    return CursorPage[UserPublic](
+        size=page.size,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_is_estimate=page.total_is_estimate,
+        results=[UserPublic.model_validate(user) for user in page.results],
+    )
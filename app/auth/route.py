@@ -1,66 +1,128 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from app.auth import service
+from app.core import keys, ratelimit
+from app.core.config import settings
+from app.core.instrumentation import query_budget
+from app.core.responses import prevalidated
 from app.models import Message
-from app.user.models import Token, UserRegister
-from app.utils.deps import SessionDep
+from app.user.models import NewPassword, RefreshToken, Token, UserRegister
+from app.utils.deps import AsyncSessionDep
 
 router = APIRouter(tags=["auth"])
+# served at the root, where other services look for it
+well_known_router = APIRouter(tags=["auth"])
 
-@router.post("/register", status_code=201, response_model=Message)
-def register_user(
+EMPTY_JWKS = b'{"keys":[]}'
+
+@router.post(
+    "/register",
+    status_code=201,
+    response_model=Message,
+    dependencies=[Depends(ratelimit.limit_by_ip("register"))],
+)
+async def register_user(
     user:UserRegister,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ) -> Message:
     """Register a new user."""
-    service.register_user(session=session, user=user)
-    return Message(message="User registered successfully. Please check your email to verify your account."
-)
+    await service.register_user(session=session, user=user)
+    return prevalidated(
+        Message(message="User registered successfully. Please check your email to verify your account."),
+        status_code=201,
+    )
     
 @router.post("/verify-email", status_code=200, response_model=Token)
-def verify_email(
+async def verify_email(
     token: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ) -> Token:
     """Verify user email."""
-    return service.verify_user_email(session=session, token=token)
+    return prevalidated(await service.verify_user_email(session=session, token=token))
 
 @router.post("/resend-verification-email", status_code=200, response_model=Message)
-def resend_verification_email(
+async def resend_verification_email(
     email: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ) -> Message:
     """Resend verification email."""
-    service.resend_verification_email(session=session, email=email)
-    return Message(message="Verification email resent successfully.")
+    await service.resend_verification_email(session=session, email=email)
+    return prevalidated(Message(message="Verification email resent successfully."))
 
-@router.post("/login", status_code=200, response_model=Token)
-def login(
+@router.post(
+    "/login",
+    status_code=200,
+    response_model=Token,
+    # the user, expired sessions, the new session, and a rehash when the policy changed
+    dependencies=[Depends(query_budget(4)), Depends(ratelimit.limit_login)],
+)
+async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Token:
     """Login user and return access token."""
-    return service.authenticate_user(session=session, email =form_data.username, password=form_data.password
-)
+    return prevalidated(await service.authenticate_user(session=session, email =form_data.username, password=form_data.password
+))
+    
+@router.post("/refresh", status_code=200, response_model=Token)
+async def refresh(
+    refresh_token: RefreshToken,
+    session: AsyncSessionDep,
+) -> Token:
+    """Exchange a refresh token for a new access and refresh token."""
+    return prevalidated(
+        await service.refresh_access_token(session=session, refresh_token=refresh_token.refresh_token)
+    )
+
+@router.post("/logout", status_code=200, response_model=Message)
+async def logout(
+    refresh_token: RefreshToken,
+    session: AsyncSessionDep,
+) -> Message:
+    """Revoke the session of a refresh token."""
+    await service.logout(session=session, refresh_token=refresh_token.refresh_token)
+    return prevalidated(Message(message="Logged out successfully."))
     
 @router.post("/recover-password", status_code=200, response_model=Message)
-def recover_password(
+async def recover_password(
     email: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ) -> Message:
     """Recover user password."""
-    service.recover_password(session=session, email=email)
-    return Message(message="Password recovery email sent successfully.")
+    await service.recover_password(session=session, email=email)
+    return prevalidated(Message(message="Password recovery email sent successfully."))
 
-@router.post("/reset-password", status_code=200, response_model=Message)
-def reset_password(
+@router.post(
+    "/reset-password",
+    status_code=200,
+    response_model=Message,
+    dependencies=[Depends(ratelimit.limit_by_ip("reset_password"))],
+)
+async def reset_password(
     token: str,
-    new_password: str,
-    session: SessionDep,
+    # validated here so a bad password is a 422 before any hashing
+    new_password: Annotated[str, Query(min_length=6, max_length=128)],
+    session: AsyncSessionDep,
 ) -> Message:
     """Reset user password."""
-    service.reset_password(session=session, token=token, new_password=new_password)
-    return Message(message="Password reset successfully.")
+    await service.reset_password(
+        session=session, new_password=NewPassword(token=token, password=new_password)
+    )
+    return prevalidated(Message(message="Password reset successfully."))
+
+
+@well_known_router.get("/.well-known/jwks.json", status_code=200)
+async def jwks() -> Response:
+    """Public keys that verify access tokens, empty while tokens use HS256.
 
+    Other services can verify tokens offline with a cached copy, e.g.
+    ``jwt.PyJWKClient``, which refetches when it meets an unknown key id.
+    """
+    key_set = keys.get_key_set()
+    return Response(
+        content=key_set.jwks_json if key_set else EMPTY_JWKS,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"},
+    )
 
@@ -1,27 +1,35 @@
 import datetime
 from fastapi import HTTPException
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core import security
+from app.auth import tokens
+from app.core import hashing, security
 from app.core.config import settings
+from app.core.instrumentation import PASSWORD_REHASHES
+from app.core.tracing import traced
+from app.tasks.queue import enqueue_email
+from app.user.cache import invalidate_user
 from app.utils import Emailhandler
 from app.user.models import User, Token, UserRegister, NewPassword
 
-def get_user_by_email(*, session: Session, email: str) -> User | None:
+@traced()
+async def get_user_by_email(*, session: AsyncSession, email: str) -> User | None:
     """Get user by email."""
     statement = select(User).where(User.email == email)
-    session_user = session.exec(statement).first()
+    session_user = (await session.exec(statement)).first()
     return session_user
 
-def register_user(*, session: Session, user:UserRegister) -> None:
+@traced()
+async def register_user(*, session: AsyncSession, user:UserRegister) -> None:
     """Register a new user."""
-    db_user = get_user_by_email(session=session, email=user.email)
+    db_user = await get_user_by_email(session=session, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered",
         )
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await hashing.hash_password(user.password)
     token = security.create_email_verification_token(user.email)
     verification_link = f"{settings.FRONTEND_HOST}/verify-email?token={token}"
     
@@ -30,17 +38,6 @@ def register_user(*, session: Session, user:UserRegister) -> None:
         verification_link=verification_link
     )
     
-    try:
-        Emailhandler.send_email(
-            email_to=user.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=202,
-            detail=f"Failed to send verification email: {str(e)}"
-        )
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -49,9 +46,18 @@ def register_user(*, session: Session, user:UserRegister) -> None:
     )
     
     session.add(db_user)
-    session.commit()
+    await session.commit()
+
+    try:
+        await enqueue_email(email_to=user.email, email_data=email_data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=202,
+            detail=f"Failed to send verification email: {str(e)}"
+        )
     
-def verify_user_email(*, session: Session, token: str) -> Token:
+@traced()
+async def verify_user_email(*, session: AsyncSession, token: str) -> Token:
     """Verify user email."""
     email = security.verify_token(token=token)
     if not email:
@@ -59,7 +65,7 @@ def verify_user_email(*, session: Session, token: str) -> Token:
             status_code=400,
             detail="Invalid token",
         )
-    db_user = get_user_by_email(session=session, email=email)
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         raise HTTPException(
             status_code=404,
@@ -71,23 +77,16 @@ def verify_user_email(*, session: Session, token: str) -> Token:
             detail="Email already verified",
         )
     db_user.is_verified = True
-    db_user.updated_at = datetime.now()
+    db_user.updated_at = datetime.datetime.now()
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    access_token = security.create_access_token(
-        subject=db_user.id,
-        expires_delta=datetime.timedelta(hours=settings.ACCESS_TOKEN_EXPIRES_MINUTES)
-    )
-    token = Token(
-        access_token=access_token,
-        token_type="bearer",
-    )
-    return token
+    await session.commit()
+    await invalidate_user(db_user.id)
+    return await tokens.issue_tokens(session=session, user_id=db_user.id)
 
-def resend_verification_email(*, session: Session, email: str) -> bool:
+@traced()
+async def resend_verification_email(*, session: AsyncSession, email: str) -> bool:
     """Resend verification email."""
-    db_user = get_user_by_email(session=session, email=email)
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         raise HTTPException(
             status_code=404,
@@ -107,11 +106,7 @@ def resend_verification_email(*, session: Session, email: str) -> bool:
     )
     
     try:
-        Emailhandler.send_email(
-            email_to=db_user.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content
-        )
+        await enqueue_email(email_to=db_user.email, email_data=email_data)
     except Exception as e:
         raise HTTPException(
             status_code=202,
@@ -119,19 +114,28 @@ def resend_verification_email(*, session: Session, email: str) -> bool:
         )
     return True
 
-def authenticate_user(*, session: Session, email: str, password: str) -> Token:
+@traced()
+async def authenticate_user(*, session: AsyncSession, email: str, password: str) -> Token:
     """Authenticate user and return access token."""
-    db_user = get_user_by_email(session=session, email=email)
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="User not found",
         )
-    if not security.verify_password(password, db_user.hashed_password):
+    verified, new_hash = await hashing.verify_and_update_password(password, db_user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=401,
             detail="Incorrect password",
         )
+    if new_hash:
+        # hash below the current policy: upgrade it now that we have the password
+        db_user.hashed_password = new_hash
+        session.add(db_user)
+        await session.commit()
+        await invalidate_user(db_user.id)
+        PASSWORD_REHASHES.inc(scheme=settings.PASSWORD_HASH_SCHEME)
   
     # if not db_user.is_verified:
     #     raise HTTPException(
@@ -139,19 +143,22 @@ def authenticate_user(*, session: Session, email: str, password: str) -> Token:
     #         detail="Email not verified",
     #     )
     
-    access_token = security.create_access_token(
-        subject=db_user.id,
-        expires_delta=datetime.timedelta(hours=settings.ACCESS_TOKEN_EXPIRES_MINUTES)
-    )
-    
-    token = Token(
-        access_token=access_token,
-        token_type="bearer",
-    )
-    return token
+    return await tokens.issue_tokens(session=session, user_id=db_user.id)
+
+@traced()
+async def refresh_access_token(*, session: AsyncSession, refresh_token: str) -> Token:
+    """Rotate a refresh token into a new access and refresh token."""
+    return await tokens.rotate(session=session, refresh_token=refresh_token)
 
-def recover_password(*, session:Session, email:str) -> bool:
-    db_user = get_user_by_email(session=session, email=email)
+@traced()
+async def logout(*, session: AsyncSession, refresh_token: str) -> bool:
+    """Revoke the login session of a refresh token and its access tokens."""
+    await tokens.revoke_refresh_token(session=session, refresh_token=refresh_token)
+    return True
+
+@traced()
+async def recover_password(*, session: AsyncSession, email:str) -> bool:
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         raise HTTPException(
             status_code=404,
@@ -165,14 +172,11 @@ def recover_password(*, session:Session, email:str) -> bool:
         token=token,
     )
     
-    Emailhandler.send_email(
-        email_to= email,
-        subject=email_data.subject,
-        html_content=email_data.html_content,
-        )
+    await enqueue_email(email_to=email, email_data=email_data)
     return True
 
-def reset_password(*, session:Session, new_password: NewPassword) -> bool:
+@traced()
+async def reset_password(*, session: AsyncSession, new_password: NewPassword) -> bool:
     email = security.verify_token(token=new_password.token)
     if not email:
         raise HTTPException(
@@ -180,17 +184,18 @@ def reset_password(*, session:Session, new_password: NewPassword) -> bool:
             detail="Invalid token",
         )
     
-    db_user = get_user_by_email(session=session, email=email)
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="User not found",
         )
     
-    hashed_password = security.get_password_hash(new_password.password)
+    hashed_password = await hashing.hash_password(new_password.password)
     db_user.hashed_password = hashed_password
-    db_user.updated_at = datetime.now()
+    db_user.updated_at = datetime.datetime.now()
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await invalidate_user(db_user.id)
+    await tokens.revoke_user_sessions(session=session, user_id=db_user.id)
     return True
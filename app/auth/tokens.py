@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import secrets
+import uuid
+
+from fastapi import HTTPException
+from sqlmodel import col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import db, security
+from app.core.config import settings
+from app.core.revocation import revocations
+from app.user.models import RefreshSession, Token
+
+logger = logging.getLogger(__name__)
+
+# revoked sessions stay in the filter until their last access token expired,
+# with some slack for clock skew between workers
+REVOCATION_SLACK = datetime.timedelta(minutes=1)
+
+
+def _hash(refresh_token: str) -> str:
+    # the token is 256 random bits, a fast hash is enough to keep it out of the table
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def _access_token_lifetime() -> datetime.timedelta:
+    return datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRES_MINUTES)
+
+
+async def issue_tokens(
+    *, session: AsyncSession, user_id: uuid.UUID, family_id: uuid.UUID | None = None
+) -> Token:
+    """Access and refresh token for a new login, or the next pair of a rotated one."""
+    now = datetime.datetime.now()
+    if family_id is None:
+        family_id = uuid.uuid4()
+        # a new login is a good time to drop this user's expired sessions
+        await session.exec(
+            delete(RefreshSession).where(
+                RefreshSession.user_id == user_id, RefreshSession.expires_at < now
+            )
+        )
+    refresh_token = secrets.token_urlsafe(32)
+    session.add(RefreshSession(
+        family_id=family_id,
+        user_id=user_id,
+        token_hash=_hash(refresh_token),
+        created_at=now,
+        expires_at=now + datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRES_DAYS),
+    ))
+    await session.commit()
+    lifetime = _access_token_lifetime()
+    access_token = security.create_access_token(
+        subject=user_id, expires_delta=lifetime, session_id=family_id
+    )
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token,
+        expires_in=int(lifetime.total_seconds()),
+    )
+
+
+async def rotate(*, session: AsyncSession, refresh_token: str) -> Token:
+    """Exchange a refresh token for a new pair; each one works exactly once.
+
+    Presenting an already used token means it leaked, so the whole login
+    session is revoked and both the thief and the user have to log in again.
+    """
+    statement = (
+        select(RefreshSession)
+        .where(RefreshSession.token_hash == _hash(refresh_token))
+        .with_for_update()
+    )
+    record = (await session.exec(statement)).first()
+    now = datetime.datetime.now()
+    if not record or record.revoked_at or record.expires_at <= now:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if record.used_at:
+        logger.warning(f"refresh token reused, revoking session {record.family_id}")
+        await revoke_sessions(session=session, family_ids=[record.family_id])
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    record.used_at = now
+    session.add(record)
+    return await issue_tokens(session=session, user_id=record.user_id, family_id=record.family_id)
+
+
+async def revoke_refresh_token(*, session: AsyncSession, refresh_token: str) -> None:
+    """Log out the session a refresh token belongs to; unknown tokens are ignored."""
+    statement = select(RefreshSession.family_id).where(
+        RefreshSession.token_hash == _hash(refresh_token)
+    )
+    family_id = (await session.exec(statement)).first()
+    if family_id:
+        await revoke_sessions(session=session, family_ids=[family_id])
+
+
+async def revoke_user_sessions(*, session: AsyncSession, user_id: uuid.UUID) -> None:
+    """Log a user out everywhere, e.g. after a password change."""
+    statement = select(RefreshSession.family_id).where(
+        RefreshSession.user_id == user_id, col(RefreshSession.revoked_at).is_(None)
+    ).distinct()
+    family_ids = list((await session.exec(statement)).all())
+    if family_ids:
+        await revoke_sessions(session=session, family_ids=family_ids)
+
+
+async def revoke_sessions(*, session: AsyncSession, family_ids: list[uuid.UUID]) -> None:
+    await session.exec(
+        update(RefreshSession)
+        .where(col(RefreshSession.family_id).in_(family_ids), col(RefreshSession.revoked_at).is_(None))
+        .values(revoked_at=datetime.datetime.now())
+    )
+    await session.commit()
+    revocations.add(family_ids)
+    await _publish(family_ids)
+
+
+async def is_session_revoked(*, session_id: uuid.UUID) -> bool:
+    """Exact check behind a revocation-filter hit.
+
+    Asked of the primary: a replica may not have replayed the revocation yet,
+    and filter hits are rare enough not to matter for its load.
+    """
+    statement = select(RefreshSession.id).where(
+        RefreshSession.family_id == session_id, col(RefreshSession.revoked_at).is_not(None)
+    ).limit(1)
+    async with db.get_async_session_maker()() as session:
+        return (await session.exec(statement)).first() is not None
+
+
+async def load_revocations() -> list[uuid.UUID]:
+    """Sessions revoked recently enough that their access tokens may still be valid."""
+    since = datetime.datetime.now() - _access_token_lifetime() - REVOCATION_SLACK
+    statement = select(RefreshSession.family_id).where(
+        col(RefreshSession.revoked_at) >= since
+    ).distinct()
+    async with db.get_async_session_maker()() as session:
+        return list((await session.exec(statement)).all())
+
+
+async def sync_revocations_periodically() -> None:
+    """Rebuild this worker's revocation filter from the database until cancelled."""
+    while True:
+        try:
+            revocations.replace(await load_revocations())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # past a few missed syncs every token is checked against the database
+            logger.warning(f"token revocation sync failed: {e}")
+        await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_SECONDS)
+
+
+async def _publish(family_ids: list[uuid.UUID]) -> None:
+    if not settings.REDIS_URL:
+        return
+    from redis.asyncio import Redis
+
+    try:
+        async with Redis.from_url(settings.REDIS_URL) as redis:
+            await redis.publish(
+                settings.TOKEN_REVOCATION_CHANNEL, ",".join(str(f) for f in family_ids)
+            )
+    except Exception as e:
+        # the periodic sync still picks it up
+        logger.warning(f"failed to publish token revocation: {e}")
+
+
+async def listen_for_revocations() -> None:
+    """Apply revocations published by other workers until cancelled."""
+    from redis.asyncio import Redis
+
+    while True:
+        try:
+            async with Redis.from_url(settings.REDIS_URL) as redis:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.TOKEN_REVOCATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            family_ids = [uuid.UUID(f) for f in message["data"].decode().split(",")]
+                        except ValueError:
+                            continue
+                        revocations.add(family_ids)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"token revocation listener failed: {e}")
+            await asyncio.sleep(1)
@@ -0,0 +1,112 @@
+import argparse
+import logging
+import statistics
+import time
+
+from app.core.config import settings
+from app.core.hashing import _available_cores
+from app.core.security import make_password_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# below these the hash is too cheap to be worth storing, whatever the latency
+MIN_BCRYPT_ROUNDS = 10
+MIN_ARGON2_MEMORY_KIB = 19456
+
+
+def measure(scheme: str, *, samples: int, **cost: int) -> float:
+    """Median seconds to hash one password at the given cost."""
+    params = {
+        "bcrypt_rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+        "argon2_time_cost": settings.PASSWORD_ARGON2_TIME_COST,
+        "argon2_memory_kib": settings.PASSWORD_ARGON2_MEMORY_KIB,
+        "argon2_parallelism": settings.PASSWORD_ARGON2_PARALLELISM,
+    }
+    params.update(cost)
+    context = make_password_context(scheme, **params)
+    context.hash("warm-up")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target: float, samples: int) -> tuple[dict[str, int], float]:
+    # each round doubles the cost, so stop as soon as the next one would overshoot
+    rounds = MIN_BCRYPT_ROUNDS
+    seconds = measure("bcrypt", samples=samples, bcrypt_rounds=rounds)
+    logger.info(f"bcrypt rounds={rounds}: {seconds * 1000:.0f}ms")
+    while seconds * 2 <= target and rounds < 31:
+        rounds += 1
+        seconds = measure("bcrypt", samples=samples, bcrypt_rounds=rounds)
+        logger.info(f"bcrypt rounds={rounds}: {seconds * 1000:.0f}ms")
+    if seconds > target:
+        logger.warning(f"even the minimum of {MIN_BCRYPT_ROUNDS} rounds is over the target")
+    return {"PASSWORD_BCRYPT_ROUNDS": rounds}, seconds
+
+
+def calibrate_argon2(target: float, samples: int, memory_kib: int) -> tuple[dict[str, int], float]:
+    # memory is the main defence, so keep it and spend the remaining budget on
+    # passes; only give memory up when a single pass is already too slow
+    time_cost = 1
+    while True:
+        seconds = measure(
+            "argon2", samples=samples, argon2_time_cost=time_cost, argon2_memory_kib=memory_kib
+        )
+        logger.info(f"argon2 memory={memory_kib}KiB time_cost={time_cost}: {seconds * 1000:.0f}ms")
+        if seconds <= target or memory_kib // 2 < MIN_ARGON2_MEMORY_KIB:
+            break
+        memory_kib //= 2
+    per_pass = seconds / time_cost
+    while (time_cost + 1) * per_pass <= target:
+        time_cost += 1
+        seconds = measure(
+            "argon2", samples=samples, argon2_time_cost=time_cost, argon2_memory_kib=memory_kib
+        )
+        logger.info(f"argon2 memory={memory_kib}KiB time_cost={time_cost}: {seconds * 1000:.0f}ms")
+        per_pass = seconds / time_cost
+    if seconds > target:
+        logger.warning(f"even {MIN_ARGON2_MEMORY_KIB}KiB and one pass are over the target")
+    return {
+        "PASSWORD_ARGON2_TIME_COST": time_cost,
+        "PASSWORD_ARGON2_MEMORY_KIB": memory_kib,
+        "PASSWORD_ARGON2_PARALLELISM": settings.PASSWORD_ARGON2_PARALLELISM,
+    }, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Pick the strongest password-hash cost that meets a latency target on this machine."
+    )
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2"), default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latency of one hash or verify")
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per candidate cost")
+    parser.add_argument(
+        "--memory-kib",
+        type=int,
+        default=settings.PASSWORD_ARGON2_MEMORY_KIB,
+        help="argon2 starting memory cost, halved only if one pass is too slow",
+    )
+    args = parser.parse_args()
+
+    target = args.target_ms / 1000
+    if args.scheme == "argon2":
+        values, seconds = calibrate_argon2(target, args.samples, args.memory_kib)
+    else:
+        values, seconds = calibrate_bcrypt(target, args.samples)
+
+    workers = settings.PASSWORD_HASH_PROCESSES or _available_cores()
+    logger.info(
+        f"{args.scheme} at {seconds * 1000:.0f}ms per hash: about "
+        f"{workers / seconds:.0f} logins/s with {workers} hashing processes"
+    )
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    for name, value in values.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
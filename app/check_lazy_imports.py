@@ -0,0 +1,28 @@
+"""Fail when importing the app loads a module that should load on first use.
+
+Needs a fresh interpreter and settings, but no database or broker; the Docker
+build runs it so a heavy import creeping back into ``app.main`` fails the image:
+
+    python -m app.check_lazy_imports
+"""
+import sys
+
+# heavy modules that must only load on first use, not when the app is imported
+LAZY_MODULES = ("sentry_sdk", "emails", "jinja2", "celery", "psycopg", "redis", "passlib")
+
+
+def eager_imports() -> list[str]:
+    import app.main  # noqa: F401
+
+    return [module for module in LAZY_MODULES if module in sys.modules]
+
+
+def main() -> None:
+    eager = eager_imports()
+    if eager:
+        sys.exit(f"imported by app.main instead of on first use: {', '.join(eager)}")
+    print(f"app.main imports none of {', '.join(LAZY_MODULES)}")
+
+
+if __name__ == "__main__":
+    main()
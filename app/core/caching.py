@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# headers describing a body, dropped when a response becomes a 304
+_BODY_HEADERS = {b"content-length", b"content-type", b"content-encoding"}
+
+
+def make_etag(*version: Any) -> str:
+    """Weak validator from version data, e.g. an id and ``updated_at``.
+
+    Weak, because the same version may be sent with different encodings.
+    """
+    digest = hashlib.blake2b("|".join(map(str, version)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def check_not_modified(request: Request, etag: str, cache_control: str = "private, no-cache") -> None:
+    """Answer 304 now if the client has this version, before any handler work.
+
+    Otherwise ``HTTPCacheMiddleware`` adds the validator to the response,
+    whatever response class the handler returns.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    request.state.cache_headers = headers
+
+
+class HTTPCacheMiddleware:
+    """Adds the headers from ``check_not_modified`` to successful GET responses,
+    and turns any GET response whose ETag the client already has into a 304."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"if-none-match"),
+            None,
+        )
+        not_modified = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal not_modified
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                headers = MutableHeaders(scope=message)
+                for name, value in scope.get("state", {}).get("cache_headers", {}).items():
+                    headers.setdefault(name, value)
+                etag = headers.get("etag")
+                if etag and etag_matches(if_none_match, etag):
+                    not_modified = True
+                    message = {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [(k, v) for k, v in message["headers"] if k.lower() not in _BODY_HEADERS],
+                    }
+            elif message["type"] == "http.response.body" and not_modified:
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": b""}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PrebuiltJSON:
+    """A JSON document encoded, hashed and optionally gzipped once, served as bytes."""
+
+    def __init__(self, content: Any, *, cache_control: str, compress: bool = True) -> None:
+        # same encoding as JSONResponse
+        self.body = json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0) if compress else None
+        self.etag = make_etag(hashlib.blake2b(self.body, digest_size=16).hexdigest())
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    def response(self, request: Request) -> Response:
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=self.headers)
+        if self.gzipped and "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(
+                self.gzipped,
+                media_type="application/json",
+                headers={**self.headers, "Content-Encoding": "gzip"},
+            )
+        return Response(self.body, media_type="application/json", headers=self.headers)
+
+
+class PrebuiltOpenAPI:
+    """Serves the app's OpenAPI document from bytes built once per worker.
+
+    Replaces FastAPI's own route, which re-encodes the schema on every hit.
+    ``build`` runs at startup; until then the first request builds it.
+    """
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+        self.document: PrebuiltJSON | None = None
+        for index, route in enumerate(app.router.routes):
+            if isinstance(route, Route) and route.path == app.openapi_url:
+                app.router.routes[index] = Route(app.openapi_url, self.endpoint, include_in_schema=False)
+
+    def build(self) -> None:
+        self.document = PrebuiltJSON(
+            self.app.openapi(), cache_control="public, no-cache", compress=settings.OPENAPI_GZIP
+        )
+
+    async def endpoint(self, request: Request) -> Response:
+        if self.document is None:
+            self.build()
+        return self.document.response(request)
@@ -1,8 +1,8 @@
 import secrets
-import warnings
-from typing import Annotated, Any, Generator, Literal
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Annotated, Any, Literal
 
-from fastapi import Depends
 from pydantic import (
     AnyUrl,
     BeforeValidator,
@@ -14,7 +14,6 @@ from pydantic import (
 )
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from sqlmodel import Session
 
 from typing_extensions import Self
 
@@ -34,8 +33,22 @@ class Settings(BaseSettings):
     )
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    # /internal/* (pool, replica, cache and revocation stats, metrics) needs an
+    # admin's access token, or this static bearer token for scrapers
+    INTERNAL_API_TOKEN: str | None = None
     
-    ACCESS_TOKEN_EXPIRES_MINUTES: int = 60 * 24 * 7  # 7 days
+    # access tokens are short-lived and not looked up per request; clients
+    # renew them with the refresh token, which is rotated on every use
+    ACCESS_TOKEN_EXPIRES_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRES_DAYS: int = 30
+    # directory of <kid>.pem RSA or Ed25519 keys: access tokens are then signed
+    # with RS256/EdDSA and other services verify them from
+    # /.well-known/jwks.json. Unset keeps HS256 with SECRET_KEY. Needs
+    # cryptography installed; `python -m app.generate_signing_key` makes keys
+    JWT_KEYS_DIR: str | None = None
+    # None signs with the newest private key in the directory
+    JWT_ACTIVE_KEY_ID: str | None = None
+    JWKS_MAX_AGE_SECONDS: int = 300
     PASSWORD_RESET_EXPIRES_MINUTES: int = 15
     EMAIL_VERIFICATION_EXPIRES_MINUTES: int = 1
     FRONTEND_HOST: str = "http://localhost:3000"
@@ -54,6 +67,8 @@ class Settings(BaseSettings):
         
     PROJECT_NAME: str
     SENTRY_DSN: HttpUrl | None = None
+    # share of requests Sentry records as performance transactions
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.05
     POSTGRES_SERVER: str
     POSTGRES_PORT: int = 5432
     POSTGRES_USER: str
@@ -71,45 +86,200 @@ class Settings(BaseSettings):
             port=self.POSTGRES_PORT,
             path=self.POSTGRES_DB,
         )
+
+    # orjson as the default response class (needs orjson installed) and no
+    # re-validation of routes returning their exact response model
+    FAST_JSON_RESPONSES: bool = False
+    # the OpenAPI document is encoded once per worker; also keep a gzipped copy
+    OPENAPI_GZIP: bool = True
+
+    # read replicas as full DSNs, comma separated or a JSON list; read-only
+    # sessions use them and fall back to the primary when none is healthy
+    POSTGRES_REPLICA_URIS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_loaded"] = "round_robin"
+    # a replica that failed is skipped for this long
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+    # a user's reads go to the primary for this long after they wrote
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # connection pool, applied per engine and per worker process. Every async
+    # request in flight waits on it, so size it to what Postgres can run at
+    # once rather than to request concurrency: more connections only add busy
+    # backends (see benchmarks/db_modes.py)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 30 * 60  # seconds, -1 disables
+    DB_POOL_PRE_PING: bool = True
+
+    # app/server.py: workers default to the cpus allowed by affinity and the
+    # cgroup quota; each is replaced after SERVER_MAX_REQUESTS (plus up to 10%
+    # jitter) or once its private memory passes SERVER_MAX_MEMORY_MB, 0 disables
+    WEB_CONCURRENCY: int | None = None
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_BACKLOG: int = 2048
+    # import the app before forking so workers share its memory
+    SERVER_PRELOAD: bool = True
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_MEMORY_MB: int = 0
+    # in-flight requests get this long to finish on shutdown or recycling
+    SERVER_GRACEFUL_TIMEOUT: float = 30.0
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_ACCESS_LOG: bool = True
+
+    # /readyz pings the database at most once per READINESS_CACHE_SECONDS
+    READINESS_CACHE_SECONDS: float = 5.0
+    READINESS_DB_TIMEOUT: float = 2.0
+    # how long app/pre_start.py keeps retrying its checks
+    PRESTART_MAX_WAIT_SECONDS: float = 300.0
+
+    # shared by all workers of one server so /internal/metrics can aggregate
+    # them; unset means each worker only reports itself. app.server empties
+    # it at startup, so two servers must not share one
+    METRICS_MULTIPROCESS_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # statements slower than this are logged with their parameter types
+    DB_SLOW_QUERY_MS: float = 200.0
+    # per-request tracking of repeated statements (identical and N+1)
+    DB_QUERY_ANALYSIS: bool = True
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # bcrypt runs in a process pool per worker; None sizes it to the available
+    # cores, 0 falls back to the threadpool
+    PASSWORD_HASH_PROCESSES: int | None = None
+    # hash/verify calls allowed in flight or queued before answering 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # new hashes use this scheme and cost; older hashes still verify and are
+    # rehashed on the next successful login. argon2 needs argon2-cffi
+    # installed, and costs PASSWORD_ARGON2_MEMORY_KIB per hashing process.
+    # `python -m app.calibrate_hashing` suggests values for this machine
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_KIB: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 1
+
+    @model_validator(mode="after")
+    def _check_password_hash_backend(self) -> Self:
+        # passlib loads on the first login, so catch a missing backend at startup
+        if self.PASSWORD_HASH_SCHEME == "argon2" and find_spec("argon2") is None:
+            raise ValueError("PASSWORD_HASH_SCHEME is argon2 but argon2-cffi is not installed")
+        return self
+
+    # per-IP and per-account limits on the bcrypt-heavy auth routes, as
+    # "<count>/<second|minute|hour|day>"; an empty value disables a rule
+    RATE_LIMIT_ENABLED: bool = True
+    # None uses Redis when REDIS_HOST is set, otherwise per-worker memory
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] | None = None
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100_000
+    RATE_LIMIT_LOGIN_IP: str = "30/minute"
+    RATE_LIMIT_LOGIN_ACCOUNT: str = "10/minute"
+    RATE_LIMIT_REGISTER_IP: str = "10/minute"
+    RATE_LIMIT_RESET_PASSWORD_IP: str = "10/minute"
+    RATE_LIMIT_UPDATE_PASSWORD_ACCOUNT: str = "5/minute"
         
-    #redis
-    # REDIS_HOST: str 
-    # REDIS_PORT: int = 6379
-    # REDIS_USER: str 
-    # REDIS_PASSWORD: str 
-    # REDIS_DB: int = 0   
+    #redis, optional: features that can fan out across workers use it when set
+    REDIS_HOST: str | None = None
+    REDIS_PORT: int = 6379
+    REDIS_USER: str | None = None
+    REDIS_PASSWORD: str | None = None
+    REDIS_DB: int = 0   
     
-    # @computed_field  # type: ignore[prop-decorator]
-    # @property
-    # def REDIS_URL(self) -> str:
-    #     return MultiHostUrl.build(
-    #         scheme="redis",
-    #         username=self.REDIS_USER,
-    #         password=self.REDIS_PASSWORD,
-    #         host=self.REDIS_HOST,
-    #         port=self.REDIS_PORT,
-    #         path=str(self.REDIS_DB),
-    #     )
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def REDIS_URL(self) -> str | None:
+        if not self.REDIS_HOST:
+            return None
+        return str(MultiHostUrl.build(
+            scheme="redis",
+            username=self.REDIS_USER,
+            password=self.REDIS_PASSWORD,
+            host=self.REDIS_HOST,
+            port=self.REDIS_PORT,
+            path=str(self.REDIS_DB),
+        ))
+
+    @model_validator(mode="after")
+    def _check_rate_limit_backend(self) -> Self:
+        # per-worker counters would multiply every limit by the worker count
+        if self.RATE_LIMIT_BACKEND == "redis" and not self.REDIS_URL:
+            raise ValueError("RATE_LIMIT_BACKEND is redis but REDIS_HOST is not set")
+        return self
+
+    # in-process cache of the authenticated user, TTL 0 disables it
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_INVALIDATION_CHANNEL: str = "user-cache-invalidate"
+
+    # revoked login sessions are kept in a per-worker Bloom filter rebuilt
+    # from the database this often; with Redis, revocations also reach the
+    # other workers immediately
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 10.0
+    TOKEN_REVOCATION_FALSE_POSITIVE_RATE: float = 0.001
+    TOKEN_REVOCATION_CHANNEL: str = "token-revocations"
+
+    # on-demand profiling: requests carrying a signed X-Profile header (see
+    # /admin/profiling/token), or a sample of them, are profiled to PROFILE_DIR;
+    # when disabled the middleware is not installed at all
+    PROFILING_ENABLED: bool = False
+    PROFILE_DIR: str = "/tmp/app-profiles"
+    PROFILE_FORMAT: Literal["pstats", "collapsed"] = "pstats"
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_TRACEMALLOC_FRAMES: int = 10
+    PROFILE_CHANNEL: str = "profiling-control"
+
+    # spans for routes, services, SQL, password hashing and SMTP tasks; every
+    # failed trace and every one over TRACING_SLOW_MS is kept, plus about
+    # TRACING_TARGET_PER_SECOND of the others per worker. The exporter is
+    # "memory", "file" (TRACING_FILE, one JSON line per trace) or a
+    # "package.module:factory" returning an object with export/shutdown
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE: str = "/tmp/app-traces/traces-{pid}.jsonl"
+    TRACING_TARGET_PER_SECOND: float = 1.0
+    TRACING_SLOW_MS: float = 500.0
+    TRACING_MAX_SPANS: int = 1000
+    TRACING_QUEUE_SIZE: int = 1000
+    TRACING_EXPORT_SECONDS: float = 5.0
+
+    @model_validator(mode="after")
+    def _check_tracing_max_spans(self) -> Self:
+        # the request's root span counts towards the limit
+        if self.TRACING_MAX_SPANS < 1:
+            raise ValueError("TRACING_MAX_SPANS must be at least 1")
+        return self
          
-    # CELERY_BROKER_URL: str
-    # CELERY_RESULT_BACKEND: str 
-    # CELERY_ACCEPT_CONTENT: list[str] = ["json"]
-    # CELERY_TASK_SERIALIZER: str = "json"
-    # CELERY_RESULT_SERIALIZER: str = "json"
-    # CELERY_TIMEZONE: str = "UTC"
-    # CELERY_ENABLE_UTC: bool = True
-    # CELERY_TASK_TRACK_STARTED: bool = True
+    # celery, falls back to REDIS_URL; with neither set tasks run eagerly
+    # in-process, which is also what tests use
+    CELERY_BROKER_URL: str | None = None
+    CELERY_RESULT_BACKEND: str | None = None
+    CELERY_TASK_ALWAYS_EAGER: bool = False
+    CELERY_ACCEPT_CONTENT: list[str] = ["json"]
+    CELERY_TASK_SERIALIZER: str = "json"
+    CELERY_RESULT_SERIALIZER: str = "json"
+    CELERY_TIMEZONE: str = "UTC"
+    CELERY_ENABLE_UTC: bool = True
+    CELERY_TASK_TRACK_STARTED: bool = True
+
+    EMAIL_TASK_MAX_RETRIES: int = 5
+    EMAIL_TASK_RETRY_BACKOFF_MAX: int = 600  # seconds
     
-    # @model_validator(mode="after")
-    # def _set_celery_broker_url(self) -> Self:
-    #     if not self.CELERY_BROKER_URL:
-    #         self.CELERY_BROKER_URL = self.REDIS_URL
-    #     return self
-    # @model_validator(mode="after")
-    # def _set_celery_result_backend(self) -> Self:
-    #     if not self.CELERY_RESULT_BACKEND:
-    #         self.CELERY_RESULT_BACKEND = self.REDIS_URL
-    #     return self
+    @model_validator(mode="after")
+    def _set_celery_broker_url(self) -> Self:
+        if not self.CELERY_BROKER_URL:
+            self.CELERY_BROKER_URL = self.REDIS_URL
+        if not self.CELERY_BROKER_URL:
+            self.CELERY_BROKER_URL = "memory://"
+            self.CELERY_TASK_ALWAYS_EAGER = True
+        return self
+    @model_validator(mode="after")
+    def _set_celery_result_backend(self) -> Self:
+        if not self.CELERY_RESULT_BACKEND:
+            self.CELERY_RESULT_BACKEND = self.REDIS_URL
+        return self
 
 
     SMTP_TLS: bool = True
@@ -118,8 +288,16 @@ class Settings(BaseSettings):
     SMTP_HOST: str | None = None
     SMTP_USER: str | None = None
     SMTP_PASSWORD: str | None = None
+    SMTP_TIMEOUT: float = 10.0
+    # persistent connections per process (API worker or Celery worker)
+    SMTP_POOL_SIZE: int = 4
+    SMTP_POOL_MAX_IDLE_SECONDS: float = 60.0
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
     EMAILS_FROM_EMAIL: EmailStr | None = None
     EMAILS_FROM_NAME: str | None = None
+    # None reloads changed templates only when ENVIRONMENT is "local"
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool | None = None
+    EMAIL_TEMPLATES_BYTECODE_CACHE_DIR: str | None = None
 
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
@@ -133,4 +311,11 @@ class Settings(BaseSettings):
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
     
     
-settings = Settings()    
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+# built at import: modules read settings at import time (middleware, pool sizes),
+# so deferring it saves nothing; get_settings() returns this same instance
+settings = get_settings()
@@ -1,14 +1,161 @@
+import uuid
+from typing import Any
 
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 from app.core.config import settings
+from app.core.instrumentation import instrument_queries
+from app.core.metrics import Counter
+from app.core.pool_metrics import (
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    instrument_engine,
+)
+from app.core.replicas import ReplicaSet, recent_writes
 from app.user.models import User
 
+READ_SESSIONS = Counter(
+    "db_read_sessions_total", "Read sessions by the engine that served them.", ("target",),
+)
 
 
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_async_session_maker: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_engine() -> Engine:
+    """Sync engine, created on first use so importing this module stays cheap."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            str(settings.SQLALCHEMY_DATABASE_URI),
+            poolclass=TimedQueuePool,
+            **_pool_options(),
+        )
+        instrument_engine(_engine, "primary")
+        instrument_queries(_engine)
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        # psycopg3 speaks both sync and async with the same "postgresql+psycopg"
+        # URL, so the async engine shares the DSN with the sync one.
+        _async_engine = create_async_engine(
+            str(settings.SQLALCHEMY_DATABASE_URI),
+            poolclass=TimedAsyncAdaptedQueuePool,
+            **_pool_options(),
+        )
+        instrument_engine(_async_engine.sync_engine, "primary_async")
+        instrument_queries(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_session_maker() -> async_sessionmaker[AsyncSession]:
+    global _async_session_maker
+    if _async_session_maker is None:
+        _async_session_maker = async_sessionmaker(
+            get_async_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _async_session_maker
+
+
+def _replica_uri(uri: str) -> str:
+    for prefix in ("postgresql://", "postgres://"):
+        if uri.startswith(prefix):
+            return "postgresql+psycopg://" + uri[len(prefix):]
+    return uri
+
+
+_replica_set: ReplicaSet | None = None
+_read_session_maker: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_replica_set() -> ReplicaSet:
+    global _replica_set
+    if _replica_set is None:
+        engines = []
+        for index, uri in enumerate(settings.POSTGRES_REPLICA_URIS):
+            engine = create_async_engine(
+                _replica_uri(uri), poolclass=TimedAsyncAdaptedQueuePool, **_pool_options()
+            )
+            instrument_engine(engine.sync_engine, f"replica_{index}")
+            instrument_queries(engine.sync_engine)
+            engines.append(engine)
+        _replica_set = ReplicaSet(
+            engines,
+            selection=settings.DB_REPLICA_SELECTION,
+            retry_after=settings.DB_REPLICA_RETRY_SECONDS,
+        )
+    return _replica_set
+
+
+def _read_target(user_id: uuid.UUID | None) -> Engine:
+    replicas = get_replica_set()
+    index = None
+    if user_id is None or not recent_writes.active(user_id):
+        index = replicas.choose()
+    if index is None:
+        READ_SESSIONS.inc(target="primary")
+        return get_async_engine().sync_engine
+    READ_SESSIONS.inc(target=f"replica_{index}")
+    return replicas.engines[index].sync_engine
+
+
+class ReadSession(Session):
+    """Session bound lazily to a replica, or to the primary for recent writers.
+
+    The target is picked on the first statement, so a caller can set
+    ``info["user_id"]`` before querying to get read-your-writes.
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Engine:
+        if self._flushing:
+            raise RuntimeError("read sessions cannot write, use AsyncSessionDep")
+        engine = self.info.get("engine")
+        if engine is None:
+            engine = self.info["engine"] = _read_target(self.info.get("user_id"))
+        return engine
+
+
+def get_read_session_maker() -> async_sessionmaker[AsyncSession]:
+    """Sessions for read-only work, served by the replicas when there are any."""
+    global _read_session_maker
+    if _read_session_maker is None:
+        _read_session_maker = async_sessionmaker(
+            class_=AsyncSession, sync_session_class=ReadSession, expire_on_commit=False
+        )
+    return _read_session_maker
+
+
+_LAZY = {
+    "engine": get_engine,
+    "async_engine": get_async_engine,
+    "async_session_maker": get_async_session_maker,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # keeps `from app.core.db import engine` working without an import-time engine
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -23,4 +170,4 @@ def init_db(session: Session) -> None:
     # from sqlmodel import SQLModel
 
     # This works because the models are already imported and registered from app.models
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+from app.core.instrumentation import PASSWORD_HASH_LATENCY, timed
+from app.core.tracing import span
+
+_executor: Executor | None = None
+_slots: asyncio.Semaphore | None = None
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_executor() -> Executor | None:
+    """Process pool used for password hashing, ``None`` when hashing runs in threads."""
+    global _executor
+    if _executor is None and settings.PASSWORD_HASH_PROCESSES != 0:
+        workers = settings.PASSWORD_HASH_PROCESSES or _available_cores()
+        # spawn instead of fork: the parent is a running event loop with threads
+        _executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+    return _slots
+
+
+def shutdown_executor() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+def check_capacity() -> None:
+    """Answer 503 now if no hash/verify slot is free, before doing any other work."""
+    if _get_slots().locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _submit(func: Callable[..., Any], *args: Any) -> Any:
+    check_capacity()
+    # the span includes waiting for a slot, which is where overload shows
+    with span(f"password.{func.__name__}", **{"password.scheme": settings.PASSWORD_HASH_SCHEME}):
+        async with _get_slots():
+            with timed(PASSWORD_HASH_LATENCY, "hash_seconds", operation=func.__name__):
+                executor = get_executor()
+                if executor is None:
+                    return await run_in_threadpool(func, *args)
+                return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def _hash_all(passwords: list[str]) -> list[str]:
+    return [security.get_password_hash(password) for password in passwords]
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash many passwords, split evenly across the pool's processes.
+
+    Bulk work waits for free slots instead of answering 503, so a large import
+    slows down but does not fail while interactive logins compete with it.
+    """
+    if not passwords:
+        return []
+    executor = get_executor()
+    # bcrypt and argon2 release the GIL, so threads parallelise too when there is no pool
+    workers = settings.PASSWORD_HASH_PROCESSES or _available_cores()
+    size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    slots = _get_slots()
+
+    async def run(chunk: list[str]) -> list[str]:
+        async with slots:
+            if executor is None:
+                return await run_in_threadpool(_hash_all, chunk)
+            return await asyncio.get_running_loop().run_in_executor(executor, _hash_all, chunk)
+
+    with span("password.hash_passwords", **{"password.count": len(passwords)}), \
+            timed(PASSWORD_HASH_LATENCY, "hash_seconds", operation="hash_passwords"):
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(security.verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify and rehash in one trip to the pool; the new hash is None when current."""
+    return await _submit(security.verify_and_update_password, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(security.get_password_hash, password)
@@ -0,0 +1,246 @@
+import logging
+import time
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import COUNT_BUCKETS, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route", "method"),
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("route",))
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed.", ("route",))
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement latency.", ("route",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request.", ("route",),
+    buckets=COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request.", ("route",),
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds", "Password hash/verify latency including queueing.",
+    ("operation",),
+)
+PASSWORD_REHASHES = Counter(
+    "password_rehashes_total", "Stored password hashes upgraded to the current policy on login.",
+    ("scheme",),
+)
+SMTP_SEND_LATENCY = Histogram(
+    "smtp_send_duration_seconds", "SMTP send latency per message or batch.", ("operation",),
+)
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements over the slow threshold.", ("route",))
+QUERY_BUDGET_EXCEEDED = Counter(
+    "db_query_budget_exceeded_total",
+    "Requests that executed more SQL statements than their route's query budget.",
+    ("route",),
+)
+REPEATED_QUERIES = Counter(
+    "db_repeated_queries_total",
+    "Requests that repeated a statement: kind is identical or n_plus_one.",
+    ("route", "kind"),
+)
+
+
+@dataclass
+class RequestStats:
+    """Work attributed to the HTTP request currently being served."""
+
+    route: str
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    hash_seconds: float = 0.0
+    smtp_seconds: float = 0.0
+    status_code: int | None = None
+    # most statements the route should need, declared with query_budget()
+    query_budget: int | None = None
+    # (statement, fingerprint of the bound values) per executed statement
+    queries: list[tuple[str, int]] = field(default_factory=list)
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+# called with the stats of every finished request, see app.utils.testing
+request_observers: list[Callable[[RequestStats], None]] = []
+
+
+def current_request() -> RequestStats | None:
+    return _current_request.get()
+
+
+def resolve_route_id(scope: Scope) -> str:
+    """Route id as produced by custom_generate_unique_id, or "unmatched"."""
+    app = scope.get("app")
+    partial = None
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "unique_id", None) or route.name
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "unique_id", None) or route.name
+    return partial or "unmatched"
+
+
+def query_budget(limit: int) -> Callable[[], Awaitable[None]]:
+    """Dependency declaring that a route executes at most ``limit`` statements.
+
+    Requests over it are logged and counted when they finish, and fail
+    app.utils.testing.assert_max_queries.
+    """
+
+    async def declare() -> None:
+        stats = _current_request.get()
+        if stats is not None:
+            stats.query_budget = limit
+
+    return declare
+
+
+@contextmanager
+def timed(histogram: Histogram, stat: str | None = None, **labels: Any) -> Iterator[None]:
+    """Observe the duration of a block and add it to the current request's ``stat``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        stats = _current_request.get()
+        if stat and stats is not None:
+            setattr(stats, stat, getattr(stats, stat) + elapsed)
+
+
+class InstrumentationMiddleware:
+    """Per-route latency, status and in-flight metrics, plus per-request DB totals."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = resolve_route_id(scope)
+        method = scope["method"]
+        stats = RequestStats(route=route)
+        token = _current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(route=route)
+            REQUESTS.inc(route=route, method=method, status=status_code)
+            REQUEST_LATENCY.observe(elapsed, route=route, method=method)
+            DB_QUERIES_PER_REQUEST.observe(stats.db_queries, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.db_seconds, route=route)
+            _current_request.reset(token)
+            stats.status_code = status_code
+            if stats.query_budget is not None and stats.db_queries > stats.query_budget:
+                report_over_budget(stats)
+            if settings.DB_QUERY_ANALYSIS:
+                report_repeated_queries(stats)
+            for observer in request_observers:
+                observer(stats)
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Types of the bound parameters, never their values."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return [f"{len(parameters)} rows", parameter_shape(parameters[0])]
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def report_over_budget(stats: RequestStats) -> None:
+    QUERY_BUDGET_EXCEEDED.inc(route=stats.route)
+    statements = "".join(f"\n  {statement}" for statement, _ in stats.queries)
+    logger.warning(
+        f"{stats.route} executed {stats.db_queries} queries, "
+        f"its budget is {stats.query_budget}{statements}"
+    )
+
+
+def report_repeated_queries(stats: RequestStats) -> None:
+    """Log identical statements and likely N+1 patterns within one request."""
+    if len(stats.queries) < 2:
+        return
+    for (statement, _), count in TallyCounter(stats.queries).items():
+        if count > 1:
+            REPEATED_QUERIES.inc(route=stats.route, kind="identical")
+            logger.warning(
+                f"identical query executed {count} times in {stats.route}: {statement}"
+            )
+    threshold = settings.DB_N_PLUS_ONE_THRESHOLD
+    for statement, count in TallyCounter(q for q, _ in stats.queries).items():
+        if count >= threshold:
+            REPEATED_QUERIES.inc(route=stats.route, kind="n_plus_one")
+            logger.warning(
+                f"query executed {count} times in {stats.route}, possible N+1: {statement}"
+            )
+
+
+def instrument_queries(engine: Engine) -> None:
+    """Count and time every statement ``engine`` executes."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current_request.get()
+        route = stats.route if stats is not None else "none"
+        DB_QUERIES.inc(route=route)
+        DB_QUERY_LATENCY.observe(elapsed, route=route)
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += elapsed
+            if settings.DB_QUERY_ANALYSIS:
+                stats.queries.append((statement, hash(repr(parameters))))
+        if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+            SLOW_QUERIES.inc(route=route)
+            logger.warning(
+                f"slow query {elapsed * 1000:.1f}ms in {route}: {statement} "
+                f"params={parameter_shape(parameters)}"
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):  # type: ignore[no-untyped-def]
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    if settings.TRACING_ENABLED:
+        from app.core.tracing import trace_queries
+
+        trace_queries(engine)
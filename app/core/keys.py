@@ -0,0 +1,109 @@
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jwt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str  # RS256 or EdDSA, from the key type
+    public_key: Any
+    private_key: Any | None = None  # None for keys kept only to verify
+
+    def jwk(self) -> dict[str, Any]:
+        if self.algorithm == "EdDSA":
+            jwk = jwt.algorithms.OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = jwt.algorithms.RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeySet:
+    """Parsed signing keys by key id, plus the one new tokens are signed with.
+
+    Rotation: add the new key file and restart so every instance publishes
+    it, then point ``JWT_ACTIVE_KEY_ID`` at it. Once the old key has not
+    signed anything for an access-token lifetime plus the JWKS cache time,
+    delete its file (or keep only its public part until then).
+    """
+
+    def __init__(self, keys: list[SigningKey], active_kid: str | None = None) -> None:
+        self.keys = {key.kid: key for key in keys}
+        signers = sorted(kid for kid, key in self.keys.items() if key.private_key is not None)
+        if not signers:
+            raise ValueError("no private signing key")
+        # key ids from app.generate_signing_key sort by creation date
+        active_kid = active_kid or signers[-1]
+        if active_kid not in signers:
+            raise ValueError(f"no private key for JWT_ACTIVE_KEY_ID {active_kid!r}")
+        self.active = self.keys[active_kid]
+        self.jwks_json = json.dumps(
+            {"keys": [key.jwk() for key in self.keys.values()]}, separators=(",", ":")
+        ).encode()
+
+    def get(self, kid: str) -> SigningKey | None:
+        return self.keys.get(kid)
+
+
+def _algorithm(key: Any) -> str:
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+    raise ValueError(f"unsupported key type {type(key).__name__}, use RSA or Ed25519")
+
+
+def load_key(path: Path) -> SigningKey:
+    """A PEM private key, or a public key that only verifies; the file name is the key id."""
+    from cryptography.hazmat.primitives import serialization
+
+    data = path.read_bytes()
+    if b"PRIVATE KEY" in data:
+        private_key = serialization.load_pem_private_key(data, password=None)
+        return SigningKey(
+            kid=path.stem,
+            algorithm=_algorithm(private_key),
+            public_key=private_key.public_key(),
+            private_key=private_key,
+        )
+    public_key = serialization.load_pem_public_key(data)
+    return SigningKey(kid=path.stem, algorithm=_algorithm(public_key), public_key=public_key)
+
+
+def load_key_set(directory: str, active_kid: str | None = None) -> KeySet:
+    keys = [load_key(path) for path in sorted(Path(directory).glob("*.pem"))]
+    if not keys:
+        raise ValueError(f"no *.pem signing keys in {directory}")
+    return KeySet(keys, active_kid)
+
+
+_key_set: KeySet | None = None
+
+
+def get_key_set() -> KeySet | None:
+    """Keys from ``JWT_KEYS_DIR``, parsed once; None when tokens use HS256."""
+    global _key_set
+    if _key_set is None and settings.JWT_KEYS_DIR:
+        _key_set = load_key_set(settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KEY_ID)
+        logger.info(
+            f"signing tokens with {_key_set.active.kid}, "
+            f"publishing {len(_key_set.keys)} key(s)"
+        )
+    return _key_set
+
+
+def init_signing() -> None:
+    """Parse the keys at startup, so a bad key fails the deploy rather than a login."""
+    if get_key_set() is None and "SECRET_KEY" not in settings.model_fields_set:
+        if settings.ENVIRONMENT != "local":
+            logger.warning("SECRET_KEY is not set, each worker signs tokens with its own random key")
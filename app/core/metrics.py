@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Metric:
+    """A labelled metric whose samples can be snapshotted and merged across workers."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # per-bucket counts (not cumulative), then sum and count
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+REGISTRY: dict[str, Metric] = {}
+
+# counters and histograms of exited workers, folded in by the supervisor
+EXITED_FILE = "exited.json"
+
+_worker: tuple[int, str] | None = None
+
+
+def worker_id() -> str:
+    """Id of this worker's snapshot file, unique even when an exited worker's pid is reused."""
+    global _worker
+    pid = os.getpid()
+    # re-derived after a fork, which copies the parent's id
+    if _worker is None or _worker[0] != pid:
+        _worker = (pid, f"{pid}-{uuid.uuid4().hex[:8]}")
+    return _worker[1]
+
+
+def snapshot() -> dict[str, Any]:
+    return {
+        "pid": os.getpid(),
+        "worker": worker_id(),
+        "metrics": {name: m.snapshot() for name, m in REGISTRY.items()},
+    }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(snapshots: list[dict[str, Any]]) -> dict[str, Any]:
+    """Sum samples across worker snapshots.
+
+    Counters and histograms of exited workers are kept so totals stay monotonic;
+    their gauges are dropped because they describe a process that is gone.
+    """
+    merged: dict[str, Any] = {}
+    for snap in snapshots:
+        alive = snap["pid"] is not None and _pid_alive(snap["pid"])
+        for name, metric in snap["metrics"].items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if key not in target["samples"]:
+                    target["samples"][key] = value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(target["samples"][key], value)]
+                else:
+                    target["samples"][key] += value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: list[str], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+_INF_LE = 'le="+Inf"'
+
+
+def render_prometheus(merged: dict[str, Any]) -> str:
+    lines: list[str] = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["samples"].items()):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_format_float(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"], value):
+                cumulative += count
+                le = f'le="{_format_float(bound)}"'
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(names, key, _INF_LE)} {value[-1]}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_format_float(value[-2])}")
+            lines.append(f"{name}_count{_labels(names, key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_dir() -> Path | None:
+    if not settings.METRICS_MULTIPROCESS_DIR:
+        return None
+    path = Path(settings.METRICS_MULTIPROCESS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _write(target: Path, snap: dict[str, Any]) -> None:
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snap))
+    tmp.replace(target)
+
+
+def _read(path: Path) -> dict[str, Any] | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def flush() -> None:
+    """Write this worker's snapshot where the other workers can read it."""
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    _write(directory / f"worker-{worker_id()}.json", snapshot())
+
+
+def reset_directory() -> None:
+    """Delete the snapshots of a previous server run.
+
+    Called by the supervisor before it forks any worker: left in place, a
+    previous run's counters would be added to this run's, and its gauges
+    read as those of live workers whenever a pid is reused.
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    for pattern in ("worker-*.json", "worker-*.tmp", EXITED_FILE, "exited.tmp"):
+        for path in directory.glob(pattern):
+            path.unlink(missing_ok=True)
+
+
+def fold_exited(pid: int) -> None:
+    """Fold the snapshot of exited worker ``pid`` into the exited file and delete it.
+
+    Called by the supervisor once it has reaped ``pid``, before the pid can be
+    reused. The exited file lists the workers folded into it, so a collect()
+    that still sees the snapshot does not count it twice.
+    """
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    paths = list(directory.glob(f"worker-{pid}-*.json"))
+    if not paths:
+        return
+    exited_path = directory / EXITED_FILE
+    exited = _read(exited_path) or {"pid": None, "folded": [], "metrics": {}}
+    folded = set(exited["folded"])
+    snapshots = [exited]
+    for path in paths:
+        snap = _read(path)
+        if snap is None or snap["worker"] in folded:
+            continue
+        folded.add(snap["worker"])
+        # the gauges describe a process that is gone
+        metrics = {name: m for name, m in snap["metrics"].items() if m["kind"] != "gauge"}
+        snapshots.append({**snap, "metrics": metrics})
+    merged = merge(snapshots)
+    for metric in merged.values():
+        metric["samples"] = [[list(key), value] for key, value in metric["samples"].items()]
+    # keep only the ids whose snapshot may still be on disk
+    live = {path.stem.removeprefix("worker-") for path in directory.glob("worker-*.json")}
+    folded_ids = sorted(worker for worker in folded if worker in live)
+    _write(exited_path, {"pid": None, "folded": folded_ids, "metrics": merged})
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def collect() -> str:
+    """Prometheus exposition for every worker sharing the metrics directory."""
+    directory = _metrics_dir()
+    if directory is None:
+        return render_prometheus(merge([snapshot()]))
+    flush()
+    exited = _read(directory / EXITED_FILE)
+    snapshots = [exited] if exited else []
+    folded = set(exited["folded"]) if exited else set()
+    for path in directory.glob("worker-*.json"):
+        snap = _read(path)
+        if snap is not None and snap["worker"] not in folded:
+            snapshots.append(snap)
+    return render_prometheus(merge(snapshots))
+
+
+async def flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError as e:
+            logger.warning(f"failed to flush metrics: {e}")
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+@dataclass
+class PoolStats:
+    """Counters for one connection pool, updated from pool events."""
+
+    name: str
+    checked_out: int = 0
+    checkouts: int = 0
+    connects: int = 0
+    invalidations: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        with self._lock:
+            data = {f.name: getattr(self, f.name) for f in fields(self) if f.repr}
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        data["wait_seconds_avg"] = (
+            data["wait_seconds_total"] / data["checkouts"] if data["checkouts"] else 0.0
+        )
+        return data
+
+
+class _TimedCheckoutMixin:
+    """Measure how long callers wait for a connection, including timeouts."""
+
+    stats: PoolStats | None = None
+
+    def connect(self):  # type: ignore[no-untyped-def]
+        stats = self.stats
+        if stats is None:
+            return super().connect()  # type: ignore[misc]
+        started = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[misc]
+        except exc.TimeoutError:
+            with stats._lock:
+                stats.timeouts += 1
+            raise
+        finally:
+            stats.record_wait(time.perf_counter() - started)
+
+    def recreate(self):  # type: ignore[no-untyped-def]
+        pool = super().recreate()  # type: ignore[misc]
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_registry: dict[str, tuple[PoolStats, Engine]] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolStats:
+    """Attach pool event listeners to ``engine`` and register it under ``name``."""
+    pool = engine.pool
+    stats = PoolStats(name=name)
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool.stats = stats
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):  # type: ignore[no-untyped-def]
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):  # type: ignore[no-untyped-def]
+        with stats._lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):  # type: ignore[no-untyped-def]
+        with stats._lock:
+            stats.checked_out = max(stats.checked_out - 1, 0)
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):  # type: ignore[no-untyped-def]
+        with stats._lock:
+            stats.invalidations += 1
+
+    _registry[name] = (stats, engine)
+    return stats
+
+
+def pool_snapshot() -> dict[str, Any]:
+    """Current statistics for every instrumented pool in this worker."""
+    return {
+        "pid": os.getpid(),
+        "pools": {
+            name: stats.snapshot(engine.pool) for name, (stats, engine) in _registry.items()
+        },
+    }
@@ -0,0 +1,287 @@
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as TallyCounter
+from pathlib import Path
+from typing import Any
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.instrumentation import resolve_route_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+# leaf frames of threads that are only waiting for work
+_IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("thread.py", "_worker")}
+
+
+def sign_profile_token(ttl_seconds: int) -> tuple[str, int]:
+    """``X-Profile`` header value that profiles any request until it expires."""
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_signature(expires)}", expires
+
+
+def _signature(expires: int) -> str:
+    message = f"profile:{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def verify_profile_token(value: str) -> bool:
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+class ProfilingControl:
+    """Sampling switches of this worker; the admin API broadcasts changes."""
+
+    def __init__(self, sample_rate: float) -> None:
+        self.sample_rate = sample_rate
+        self.route: str | None = None
+        self.until: float | None = None
+        self.profiled = 0
+
+    def apply(self, *, sample_rate: float, route: str | None = None, until: float | None = None) -> None:
+        self.sample_rate, self.route, self.until = sample_rate, route, until
+
+    def sampled(self, scope: Scope) -> bool:
+        if self.until is not None and time.time() > self.until:
+            self.apply(sample_rate=settings.PROFILE_SAMPLE_RATE)
+        if random.random() >= self.sample_rate:
+            return False
+        return self.route is None or resolve_route_id(scope) == self.route
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "sample_rate": self.sample_rate,
+            "route": self.route,
+            "until": self.until,
+            "profiled": self.profiled,
+        }
+
+
+control = ProfilingControl(settings.PROFILE_SAMPLE_RATE)
+
+
+class StackSampler:
+    """Collapsed stacks of every busy thread, sampled from a background thread.
+
+    Unlike cProfile this also sees work in the threadpool (SMTP, sync
+    database calls); the output feeds flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: TallyCounter[str] = TallyCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def enable(self) -> None:
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path: Path) -> None:
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.items()))
+
+
+def _new_profiler(format: str) -> cProfile.Profile | StackSampler:
+    if format == "collapsed":
+        return StackSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    return cProfile.Profile()
+
+
+class ProfilingMiddleware:
+    """Profile requests carrying a signed ``X-Profile`` header, or a sample of them.
+
+    Only installed when PROFILING_ENABLED is set, so it costs nothing
+    otherwise. One request is profiled at a time per worker; cProfile sees
+    everything on the event loop thread meanwhile, including concurrent
+    requests, so profile a quiet worker for clean numbers.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._busy:
+            await self.app(scope, receive, send)
+            return
+        token = format = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                token = value.decode("latin-1")
+            elif name == b"x-profile-format":
+                format = value.decode("latin-1")
+        requested = token is not None
+        if requested:
+            if not verify_profile_token(token):
+                await self.app(scope, receive, send)
+                return
+        elif not control.sample_rate or not control.sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        format = format if format in ("pstats", "collapsed") else settings.PROFILE_FORMAT
+        route = resolve_route_id(scope)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{control.profiled}-{route}.{format}"
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        async def send_wrapper(message: Message) -> None:
+            if requested and message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-File"] = name
+            await send(message)
+
+        profiler = _new_profiler(format)
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # another profiler (e.g. an APM agent) owns the hook
+            logger.warning(f"cannot profile request: {e}")
+            await self.app(scope, receive, send)
+            return
+        self._busy = True
+        try:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+            profiler.dump_stats(directory / name)
+        finally:
+            control.profiled += 1
+            self._busy = False
+
+
+class MemoryTracker:
+    """tracemalloc snapshots of this worker, each diffed against the previous one.
+
+    Blocking: taking, dumping and diffing a snapshot of a large heap takes
+    seconds, so callers on the event loop run it in a thread.
+    """
+
+    def __init__(self) -> None:
+        self.previous: tracemalloc.Snapshot | None = None
+        # snapshots from concurrent requests would race on ``previous``
+        self._lock = threading.Lock()
+
+    def snapshot(self, top: int = 25) -> dict[str, Any]:
+        with self._lock:
+            return self._snapshot(top)
+
+    def _snapshot(self, top: int) -> dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            # tracing slows every allocation, so it only runs between start and stop
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+            self.previous = None
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.tracemalloc"
+        snapshot.dump(str(directory / name))
+        compared = self.previous is not None
+        if self.previous is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self.previous, "lineno")
+        self.previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "file": name,
+            "traced_kib": current // 1024,
+            "peak_kib": peak // 1024,
+            "compared_to_previous": compared,
+            "top": [
+                {
+                    "location": str(stat.traceback),
+                    "size_kib": stat.size // 1024,
+                    "size_diff_kib": getattr(stat, "size_diff", stat.size) // 1024,
+                    "count_diff": getattr(stat, "count_diff", stat.count),
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self.previous = None
+
+
+memory_tracker = MemoryTracker()
+
+
+async def publish_control(state: dict[str, Any]) -> None:
+    """Apply a sampling change here and, with Redis, on every other worker."""
+    control.apply(**state)
+    if not settings.REDIS_URL:
+        return
+    from redis.asyncio import Redis
+
+    try:
+        async with Redis.from_url(settings.REDIS_URL) as redis:
+            await redis.publish(settings.PROFILE_CHANNEL, json.dumps(state))
+    except Exception as e:
+        logger.warning(f"failed to publish profiling change: {e}")
+
+
+async def listen_for_control() -> None:
+    """Apply sampling changes published by other workers until cancelled."""
+    from redis.asyncio import Redis
+
+    while True:
+        try:
+            async with Redis.from_url(settings.REDIS_URL) as redis:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.PROFILE_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            control.apply(**json.loads(message["data"]))
+                        except (ValueError, TypeError):
+                            continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"profiling control listener failed: {e}")
+            await asyncio.sleep(1)
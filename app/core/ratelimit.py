@@ -0,0 +1,196 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Annotated, Any, Awaitable, Callable
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.core import hashing
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected by a rate limit.", ("rule", "scope"),
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    period: int  # seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit | None":
+        """``"10/minute"`` style limits, an empty string disables the rule."""
+        if not value:
+            return None
+        count, _, unit = value.partition("/")
+        period = _PERIODS.get(unit.strip().rstrip("s"))
+        if period is None:
+            raise ValueError(f"invalid rate limit {value!r}, expected e.g. 10/minute")
+        return cls(limit=int(count), period=period)
+
+
+def _retry_after(limit: int, period: float, elapsed: float, current: int, previous: int) -> float:
+    """Seconds until the sliding-window estimate drops below ``limit``."""
+    if current >= limit:
+        # wait for the window to roll, then for the carried-over weight to decay
+        decay = period * (1 - limit / current) if current else 0.0
+        return period - elapsed + decay
+    return max(period * (1 - (limit - current) / previous) - elapsed, 0.0)
+
+
+class MemoryBackend:
+    """Sliding-window counters for this worker only.
+
+    Each key keeps the count of the current and the previous fixed window; the
+    previous one is weighted by how much of it still overlaps the sliding
+    window. No locking is needed since everything runs on the event loop.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._windows: dict[str, list[int]] = {}
+
+    def _evict(self, now_window: int) -> None:
+        for key in [k for k, (window, _, _) in self._windows.items() if window < now_window - 1]:
+            del self._windows[key]
+        while len(self._windows) >= self.max_keys:
+            del self._windows[next(iter(self._windows))]
+
+    async def hit(self, key: str, rule: RateLimit, now: float) -> float | None:
+        window, elapsed = divmod(now, rule.period)
+        window = int(window)
+        entry = self._windows.get(key)
+        if entry is None:
+            if len(self._windows) >= self.max_keys:
+                self._evict(window)
+            entry = self._windows[key] = [window, 0, 0]
+        elif entry[0] != window:
+            entry[2] = entry[1] if entry[0] == window - 1 else 0
+            entry[0], entry[1] = window, 0
+        _, current, previous = entry
+        if previous * (1 - elapsed / rule.period) + current >= rule.limit:
+            return _retry_after(rule.limit, rule.period, elapsed, current, previous)
+        entry[1] += 1
+        return None
+
+    def clear(self) -> None:
+        self._windows.clear()
+
+
+# KEYS: current window, previous window; ARGV: limit, previous weight, ttl ms
+_SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return {1, current + 1, previous}
+"""
+
+
+class RedisBackend:
+    """Sliding-window counters shared by every worker through Redis."""
+
+    def __init__(self, url: str) -> None:
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url)
+        self._script = self._redis.register_script(_SLIDING_WINDOW_LUA)
+
+    async def hit(self, key: str, rule: RateLimit, now: float) -> float | None:
+        window, elapsed = divmod(now, rule.period)
+        window = int(window)
+        try:
+            allowed, current, previous = await self._script(
+                keys=[f"ratelimit:{key}:{window}", f"ratelimit:{key}:{window - 1}"],
+                args=[rule.limit, 1 - elapsed / rule.period, rule.period * 2 * 1000],
+            )
+        except Exception as e:
+            # fail open: an unreachable Redis must not lock everyone out
+            logger.warning(f"rate limit check failed, allowing request: {e}")
+            return None
+        if allowed:
+            return None
+        return _retry_after(rule.limit, rule.period, elapsed, int(current), int(previous))
+
+    def clear(self) -> None:
+        pass
+
+
+_backend: MemoryBackend | RedisBackend | None = None
+
+
+def get_backend() -> MemoryBackend | RedisBackend:
+    global _backend
+    if _backend is None:
+        backend = settings.RATE_LIMIT_BACKEND or ("redis" if settings.REDIS_URL else "memory")
+        if backend == "redis":
+            _backend = RedisBackend(settings.REDIS_URL)
+        else:
+            _backend = MemoryBackend(max_keys=settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+    return _backend
+
+
+def client_ip(request: Request) -> str:
+    # behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce(rule_name: str, scope: str, key: str) -> None:
+    """Count one attempt against a rule and raise 429 once it is exhausted."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    rule = RateLimit.parse(getattr(settings, f"RATE_LIMIT_{rule_name.upper()}_{scope.upper()}"))
+    if rule is None:
+        return
+    retry_after = await get_backend().hit(f"{rule_name}:{scope}:{key}", rule, time.time())
+    if retry_after is not None:
+        RATE_LIMITED.inc(rule=rule_name, scope=scope)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+def limit_by_ip(rule_name: str) -> Callable[[Request], Awaitable[None]]:
+    """Dependency limiting a bcrypt-heavy route per client IP.
+
+    Runs before the route's own dependencies, so a rejected request costs
+    neither a database query nor a hash.
+    """
+
+    async def dependency(request: Request) -> None:
+        hashing.check_capacity()
+        await enforce(rule_name, "ip", client_ip(request))
+
+    return dependency
+
+
+async def limit_login(
+    request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> None:
+    """Per-IP and per-account limits for login, so a botnet cannot brute-force one user."""
+    hashing.check_capacity()
+    await enforce("login", "ip", client_ip(request))
+    await enforce("login", "account", form_data.username.strip().lower())
+
+
+def limit_by_account(rule_name: str, get_user: Callable[..., Any]) -> Callable[..., Awaitable[None]]:
+    """Dependency limiting an authenticated route per user."""
+
+    async def dependency(user: Annotated[Any, Depends(get_user)]) -> None:
+        hashing.check_capacity()
+        await enforce(rule_name, "account", str(user.id))
+
+    return dependency
@@ -0,0 +1,94 @@
+import itertools
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ReplicaSet:
+    """Read replicas with round-robin or least-loaded selection.
+
+    A replica whose connection fails is skipped for ``retry_after`` seconds;
+    with every replica skipped (or none configured) reads go to the primary.
+    """
+
+    def __init__(
+        self, engines: list[AsyncEngine], *, selection: str, retry_after: float
+    ) -> None:
+        self.engines = engines
+        self.selection = selection
+        self.retry_after = retry_after
+        self._unhealthy_until: dict[int, float] = {}
+        self._next = itertools.count()
+        for index, engine in enumerate(engines):
+            self._watch(index, engine.sync_engine)
+
+    def _watch(self, index: int, engine: Engine) -> None:
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):  # type: ignore[no-untyped-def]
+            if context.is_disconnect or context.connection is None:
+                self.mark_failed(index, context.original_exception)
+
+    def mark_failed(self, index: int, error: BaseException | None = None) -> None:
+        if index not in self._unhealthy_until:
+            logger.warning(f"read replica {index} failed, using others for {self.retry_after}s: {error!r}")
+        self._unhealthy_until[index] = time.monotonic() + self.retry_after
+
+    def healthy(self) -> list[int]:
+        now = time.monotonic()
+        return [i for i in range(len(self.engines)) if self._unhealthy_until.get(i, 0.0) <= now]
+
+    def choose(self) -> int | None:
+        """Index of the replica for the next read session, None for the primary."""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if self.selection == "least_loaded":
+            return min(candidates, key=lambda i: self.engines[i].pool.checkedout())
+        return candidates[next(self._next) % len(candidates)]
+
+    def stats(self) -> list[dict[str, Any]]:
+        healthy = set(self.healthy())
+        return [
+            {
+                "replica": index,
+                "healthy": index in healthy,
+                "checked_out": engine.pool.checkedout(),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+class RecentWrites:
+    """Users who wrote within the last ``window`` seconds read from the primary."""
+
+    def __init__(self, window: float, max_size: int = 100_000) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._until: dict[UUID, float] = {}
+
+    def note(self, user_id: UUID) -> None:
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        if len(self._until) >= self.max_size:
+            self._until = {k: v for k, v in self._until.items() if v > now}
+        self._until[user_id] = now + self.window
+
+    def active(self, user_id: UUID) -> bool:
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[user_id]
+            return False
+        return True
+
+
+recent_writes = RecentWrites(window=settings.DB_READ_YOUR_WRITES_SECONDS)
@@ -0,0 +1,42 @@
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def default_response_class() -> type[JSONResponse]:
+    """Response class for the app: orjson-backed when FAST_JSON_RESPONSES is on."""
+    if not settings.FAST_JSON_RESPONSES:
+        return JSONResponse
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        logger.warning("FAST_JSON_RESPONSES is set but orjson is not installed, using JSONResponse")
+        return JSONResponse
+    return ORJSONResponse
+
+
+class ModelResponse(JSONResponse):
+    """Serialize a pydantic model straight to JSON bytes in pydantic-core."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
+
+
+def prevalidated(model: BaseModel, status_code: int = 200) -> Any:
+    """Return a model that already is the route's exact ``response_model``.
+
+    With FAST_JSON_RESPONSES it is wrapped in a ``ModelResponse``, so FastAPI
+    neither validates it against the response model again nor converts it to
+    Python primitives before encoding. ``status_code`` must match the route's.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return model
+    return ModelResponse(model, status_code=status_code)
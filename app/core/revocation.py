@@ -0,0 +1,96 @@
+import hashlib
+import math
+import time
+from typing import Any, Iterable
+from uuid import UUID
+
+from app.core.config import settings
+
+
+class BloomFilter:
+    """Fixed-size set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        # double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class RevocationList:
+    """Revoked login sessions, checked on every request without a round trip.
+
+    A hit only means "maybe revoked" and is confirmed against the database.
+    The filter is rebuilt from the database every ``sync_seconds``; if that
+    stops working it is treated as stale and every session is confirmed.
+    """
+
+    def __init__(self, sync_seconds: float, error_rate: float) -> None:
+        self.sync_seconds = sync_seconds
+        self.error_rate = error_rate
+        self.checks = 0
+        self.maybe = 0
+        self._filter = BloomFilter(1, error_rate)
+        self._synced_at: float | None = None
+        # local additions, kept across a sync whose query may have started before them
+        self._recent: dict[UUID, float] = {}
+
+    @property
+    def fresh(self) -> bool:
+        return self._synced_at is not None and time.monotonic() - self._synced_at <= 3 * self.sync_seconds
+
+    def replace(self, session_ids: list[UUID]) -> None:
+        """Swap in a filter of these sessions, sized with room to grow."""
+        now = time.monotonic()
+        self._recent = {k: t for k, t in self._recent.items() if t > now - 2 * self.sync_seconds}
+        bloom = BloomFilter(max(2 * (len(session_ids) + len(self._recent)), 1024), self.error_rate)
+        for session_id in [*session_ids, *self._recent]:
+            bloom.add(session_id.bytes)
+        self._filter = bloom
+        self._synced_at = now
+
+    def add(self, session_ids: Iterable[UUID]) -> None:
+        now = time.monotonic()
+        for session_id in session_ids:
+            self._filter.add(session_id.bytes)
+            self._recent[session_id] = now
+
+    def might_be_revoked(self, session_id: UUID) -> bool:
+        self.checks += 1
+        if not self.fresh or session_id.bytes in self._filter:
+            self.maybe += 1
+            return True
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "fresh": self.fresh,
+            "entries": self._filter.count,
+            "capacity": self._filter.capacity,
+            "size_bytes": len(self._filter._bits),
+            "checks": self.checks,
+            "maybe_revoked": self.maybe,
+        }
+
+
+revocations = RevocationList(
+    sync_seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    error_rate=settings.TOKEN_REVOCATION_FALSE_POSITIVE_RATE,
+)
@@ -1,22 +1,93 @@
 import datetime
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 import jwt
 import uuid
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.keys import get_key_set
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# passlib is imported when the first password is hashed or verified, usually in
+# the hashing pool's processes, not when the app is imported
+
+
+def make_password_context(
+    scheme: str,
+    *,
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_kib: int,
+    argon2_parallelism: int,
+) -> "CryptContext":
+    """Hash with ``scheme``; every other scheme and cost still verifies but needs an update."""
+    from passlib.context import CryptContext
+    from passlib.hash import argon2
+
+    if scheme == "argon2":
+        # raises MissingBackendError at startup instead of on the first login
+        argon2.get_backend()
+    return CryptContext(
+        schemes=[scheme] + [other for other in ("bcrypt", "argon2") if other != scheme],
+        deprecated="auto",
+        # min == max: a hash at any other cost, higher or lower, gets rehashed
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__default_rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_kib,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+_pwd_context: "CryptContext | None" = None
+
+
+def get_password_context() -> "CryptContext":
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = make_password_context(
+            settings.PASSWORD_HASH_SCHEME,
+            bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+            argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+            argon2_memory_kib=settings.PASSWORD_ARGON2_MEMORY_KIB,
+            argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+        )
+    return _pwd_context
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: datetime.timedelta) -> str:
+def create_access_token(
+    subject: str | Any, expires_delta: datetime.timedelta, session_id: uuid.UUID
+) -> str:
     expire = datetime.datetime.now(datetime.timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    to_encode = {"exp": expire, "sub": str(subject), "sid": str(session_id)}
+    key_set = get_key_set()
+    if key_set is None:
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    key = key_set.active
+    return jwt.encode(to_encode, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+
+def decode_access_token(token: str) -> dict[str, Any]:
+    """Verify an access token against the parsed key set, without any I/O.
+
+    Raises ``jwt.InvalidTokenError``. With a key set, the key id picks the
+    key and its algorithm, so an HS256 token can never pass as signed.
+    """
+    key_set = get_key_set()
+    if key_set is None:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = key_set.get(kid) if isinstance(kid, str) else None
+    if key is None:
+        raise jwt.InvalidTokenError("unknown signing key")
+    return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
 
 def create_email_verification_token(email: str) -> str:
     delta = datetime.timedelta(hours=settings.EMAIL_VERIFICATION_EXPIRES_MINUTES)
@@ -32,7 +103,7 @@ def create_email_verification_token(email: str) -> str:
 
 
 def generate_password_reset_token(email: str) -> str:
-    delta = datetime.timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
+    delta = datetime.timedelta(minutes=settings.PASSWORD_RESET_EXPIRES_MINUTES)
     now = datetime.datetime.now(datetime.timezone.utc)
     expires = now + delta
     exp = expires.timestamp()
@@ -56,8 +127,13 @@ def verify_token(token: str) -> str | None:
     
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return get_password_context().hash(password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify, and return a new hash when the stored one is below the current policy."""
+    return get_password_context().verify_and_update(plain_password, hashed_password)
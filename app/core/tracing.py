@@ -0,0 +1,451 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.instrumentation import current_request, resolve_route_id
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+TRACES = Counter(
+    "traces_total", "Finished traces by sampling decision: error, slow, parent, sampled or dropped.",
+    ("decision",),
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float  # perf_counter
+    end: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+
+class Trace:
+    """Spans of one request or task, kept or dropped as a whole once it ends."""
+
+    def __init__(self, trace_id: str | None = None, *, parent_sampled: bool = False) -> None:
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.parent_sampled = parent_sampled
+        # head decision, made when the trace starts so it can be propagated
+        self.sampled = parent_sampled
+        self.spans: list[Span] = []
+        self.dropped = 0
+        # turns perf_counter readings into wall clock time at export
+        self.epoch = time.time() - time.perf_counter()
+
+    def start_span(
+        self, name: str, parent_id: str | None, start: float | None = None, **attributes: Any
+    ) -> Span | None:
+        """A new span, or None once the trace holds TRACING_MAX_SPANS (a bulk import)."""
+        if len(self.spans) >= settings.TRACING_MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = Span(
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            name=name,
+            start=time.perf_counter() if start is None else start,
+            attributes=attributes,
+        )
+        self.spans.append(span)
+        return span
+
+    def to_dict(self, decision: str) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "service": settings.PROJECT_NAME,
+            "pid": os.getpid(),
+            "decision": decision,
+            "dropped_spans": self.dropped,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "start": round(self.epoch + span.start, 6),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_current: ContextVar[tuple[Trace, Span] | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    current = _current.get()
+    return current[1] if current is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """A child of the current span; does nothing outside a traced request or task."""
+    current = _current.get()
+    child = current[0].start_span(name, current[1].span_id, **attributes) if current else None
+    if child is None:
+        yield None
+        return
+    token = _current.set((current[0], child))
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Run every call of the decorated function in a span named after it.
+
+    Decided at import: with TRACING_ENABLED unset the function is returned
+    unchanged.
+    """
+
+    def decorate(func: F) -> F:
+        if not settings.TRACING_ENABLED:
+            return func
+        span_name = name or f"{func.__module__.removeprefix('app.')}.{func.__name__}"
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def parse_traceparent(value: str | None) -> tuple[str | None, str | None, bool]:
+    """Trace id, parent span id and sampled flag of a W3C ``traceparent``."""
+    parts = (value or "").split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, False
+    try:
+        sampled = bool(int(parts[3][:2], 16) & 1)
+    except ValueError:
+        return None, None, False
+    return parts[1], parts[2], sampled
+
+
+def propagation_headers() -> dict[str, str]:
+    """``traceparent`` for work handed to another process, e.g. a Celery task.
+
+    The sampled flag carries the head decision only: a trace kept afterwards
+    for failing or being slow was not marked when its tasks were enqueued.
+    """
+    current = _current.get()
+    if current is None:
+        return {}
+    trace, parent = current
+    flags = "01" if trace.sampled else "00"
+    return {"traceparent": f"00-{trace.trace_id}-{parent.span_id}-{flags}"}
+
+
+class AdaptiveSampler:
+    """Keeps every failed or slow trace, and about ``per_second`` of the others.
+
+    The keep probability for ordinary traces follows the request rate seen
+    in the previous window, so a quiet worker keeps all of them and a busy
+    one a steady trickle. That draw is made in start(), so the decision is
+    known to propagation_headers() while the trace runs; traces whose caller
+    sampled them are kept too, so distributed traces stay whole.
+    """
+
+    def __init__(self, per_second: float, slow_ms: float, window: float = 10.0) -> None:
+        self.per_second = per_second
+        self.slow = slow_ms / 1000
+        self.window = window
+        self.probability = 1.0
+        self._seen = 0
+        self._window_start = time.monotonic()
+
+    def start(self, trace: Trace) -> None:
+        now = time.monotonic()
+        self._seen += 1
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.probability = min(1.0, self.per_second * elapsed / self._seen)
+            self._seen = 0
+            self._window_start = now
+        if not trace.sampled and random.random() < self.probability:
+            trace.sampled = True
+
+    def decide(self, trace: Trace, root: Span) -> str | None:
+        if root.error is not None:
+            return "error"
+        if root.duration >= self.slow:
+            return "slow"
+        if trace.parent_sampled:
+            return "parent"
+        if trace.sampled:
+            return "sampled"
+        return None
+
+
+sampler = AdaptiveSampler(settings.TRACING_TARGET_PER_SECOND, settings.TRACING_SLOW_MS)
+
+
+class SpanExporter(Protocol):
+    def export(self, traces: list[dict[str, Any]]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class InMemoryExporter:
+    """Keeps the last ``max_traces`` exported traces, for tests."""
+
+    def __init__(self, max_traces: int = 1000) -> None:
+        self.traces: deque[dict[str, Any]] = deque(maxlen=max_traces)
+
+    def export(self, traces: list[dict[str, Any]]) -> None:
+        self.traces.extend(traces)
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileExporter:
+    """Appends one JSON line per trace; ``{pid}`` in the path gives each worker its own file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path.format(pid=os.getpid()))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, traces: list[dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(trace, default=str) + "\n" for trace in traces)
+        with self.path.open("a") as f:
+            f.write(lines)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _load_exporter(name: str) -> SpanExporter:
+    if name == "memory":
+        return InMemoryExporter()
+    if name == "file":
+        return FileExporter(settings.TRACING_FILE)
+    # "package.module:factory", called without arguments
+    module, _, attribute = name.partition(":")
+    return getattr(importlib.import_module(module), attribute)()
+
+
+_exporter: SpanExporter | None = None
+_pending: deque[dict[str, Any]] = deque(maxlen=settings.TRACING_QUEUE_SIZE)
+_flush_lock = threading.Lock()
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = _load_exporter(settings.TRACING_EXPORTER)
+    return _exporter
+
+
+def set_exporter(exporter: SpanExporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def finish(trace: Trace, root: Span) -> None:
+    """Decide whether to keep a finished trace and queue it for export."""
+    decision = sampler.decide(trace, root)
+    TRACES.inc(decision=decision or "dropped")
+    if decision is not None:
+        # bounded: if the exporter falls behind the oldest traces are lost
+        _pending.append(trace.to_dict(decision))
+
+
+def flush() -> None:
+    with _flush_lock:
+        batch = [_pending.popleft() for _ in range(len(_pending))]
+        if batch:
+            get_exporter().export(batch)
+
+
+async def export_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.TRACING_EXPORT_SECONDS)
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            logger.warning(f"failed to export traces: {e}")
+
+
+def shutdown() -> None:
+    flush()
+    if _exporter is not None:
+        _exporter.shutdown()
+
+
+class TracingMiddleware:
+    """Root span for every HTTP request; installed only when TRACING_ENABLED is set."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = current_request()
+        route = stats.route if stats is not None else resolve_route_id(scope)
+        traceparent = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"traceparent"),
+            None,
+        )
+        trace_id, parent_id, parent_sampled = parse_traceparent(traceparent)
+        trace = Trace(trace_id, parent_sampled=parent_sampled)
+        sampler.start(trace)
+        root = trace.start_span(
+            f"{scope['method']} {route}",
+            parent_id,
+            **{"http.method": scope["method"], "http.route": route, "http.target": scope["path"]},
+        )
+        assert root is not None
+        token = _current.set((trace, root))
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.fail(e)
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current.reset(token)
+            root.set(**{"http.status_code": status_code})
+            if status_code >= 500 and root.error is None:
+                root.error = f"HTTP {status_code}"
+            finish(trace, root)
+
+
+def trace_queries(engine: Engine) -> None:
+    """A span for every statement ``engine`` executes within a traced request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        conn.info.setdefault("span_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        started = conn.info["span_started"].pop()
+        current = _current.get()
+        if current is None:
+            return
+        child = current[0].start_span(
+            "db.query", current[1].span_id, start=started, **{"db.statement": statement[:500]}
+        )
+        if child is not None:
+            child.end = time.perf_counter()
+            if executemany:
+                child.set(**{"db.rows": len(parameters)})
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):  # type: ignore[no-untyped-def]
+        conn = exception_context.connection
+        if conn is None or not conn.info.get("span_started"):
+            return
+        started = conn.info["span_started"].pop()
+        current = _current.get()
+        if current is None:
+            return
+        child = current[0].start_span(
+            "db.query", current[1].span_id, start=started,
+            **({"db.statement": exception_context.statement[:500]} if exception_context.statement else {}),
+        )
+        if child is not None:
+            child.end = time.perf_counter()
+            child.fail(exception_context.original_exception)
+
+
+# Celery tasks, wired to the task_prerun/task_postrun signals in app.tasks.worker
+
+_tasks: dict[str, tuple[Token | None, Trace, Span | None]] = {}
+
+
+def task_started(task_id: str, name: str, traceparent: str | None) -> None:
+    # eager tasks too: they run on a thread of their own after the request
+    # that queued them has usually been exported, so they never join its
+    # Trace object, only its trace id through the traceparent header
+    trace_id, parent_id, parent_sampled = parse_traceparent(traceparent)
+    trace = Trace(trace_id, parent_sampled=parent_sampled)
+    sampler.start(trace)
+    task_span = trace.start_span(f"task {name}", parent_id, **{"celery.task": name})
+    token = _current.set((trace, task_span)) if task_span is not None else None
+    _tasks[task_id] = (token, trace, task_span)
+
+
+def task_finished(task_id: str, state: str | None, retval: Any) -> None:
+    token, trace, task_span = _tasks.pop(task_id, (None, None, None))
+    if token is not None:
+        _current.reset(token)
+    if task_span is None:
+        return
+    task_span.end = time.perf_counter()
+    task_span.set(**{"celery.state": state})
+    if isinstance(retval, BaseException):
+        task_span.fail(retval)
+    elif state in ("FAILURE", "RETRY"):
+        task_span.error = state
+    finish(trace, task_span)
+    # workers have no event loop to export from, and no latency to protect
+    flush()
@@ -0,0 +1,70 @@
+import argparse
+import datetime
+import logging
+import os
+import secrets
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.keys import load_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate(directory: Path, algorithm: str, rsa_bits: int) -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=rsa_bits)
+    # dated ids sort by age, the newest is the default signing key
+    kid = f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{kid}.pem"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    return kid
+
+
+def retire(directory: Path, kid: str) -> None:
+    """Keep only the public part, so the key still verifies but can no longer sign."""
+    from cryptography.hazmat.primitives import serialization
+
+    path = directory / f"{kid}.pem"
+    key = load_key(path)
+    path.write_bytes(key.public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create or retire a JWT signing key.")
+    parser.add_argument("--dir", default=settings.JWT_KEYS_DIR, help="defaults to JWT_KEYS_DIR")
+    parser.add_argument("--algorithm", choices=("RS256", "EdDSA"), default="RS256")
+    parser.add_argument("--rsa-bits", type=int, default=2048)
+    parser.add_argument("--retire", metavar="KID", help="strip the private part of this key")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir is required when JWT_KEYS_DIR is not set")
+
+    directory = Path(args.dir)
+    if args.retire:
+        retire(directory, args.retire)
+        logger.info(f"{args.retire} now only verifies")
+        return
+    kid = generate(directory, args.algorithm, args.rsa_bits)
+    logger.info(f"created {args.algorithm} key {kid} in {directory}")
+    print(kid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from typing import Any
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.health.service import readiness
+
+router = APIRouter(tags=["health"], include_in_schema=False)
+
+
+@router.get("/healthz", status_code=200)
+async def liveness() -> dict[str, str]:
+    """Liveness: the worker is serving requests. Never touches the database."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", status_code=200)
+async def readiness_check() -> Any:
+    """Readiness: a cached database ping and free capacity in the pool."""
+    result = await readiness.check()
+    if not result["ready"]:
+        return JSONResponse(result, status_code=503)
+    return result
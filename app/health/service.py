@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import text
+
+from app.core import db
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def pool_capacity() -> dict[str, Any]:
+    """Whether the async pool can still hand out a connection without waiting."""
+    pool = db.get_async_engine().pool
+    in_use = pool.checkedout()
+    if settings.DB_MAX_OVERFLOW < 0:
+        # SQLAlchemy treats a negative max_overflow as unlimited
+        return {"ok": True, "in_use": in_use, "capacity": None}
+    capacity = pool.size() + settings.DB_MAX_OVERFLOW
+    return {"ok": in_use < capacity, "in_use": in_use, "capacity": capacity}
+
+
+async def _select_one() -> None:
+    async with db.get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def ping_database() -> dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        # connecting counts too: a blackholed server hangs in connect, not in the query
+        await asyncio.wait_for(_select_one(), timeout=settings.READINESS_DB_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"readiness database ping failed: {e!r}")
+        return {"ok": False, "error": type(e).__name__}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+class ReadinessProbe:
+    """Database ping shared by every probe within ``ttl`` seconds.
+
+    However often the load balancer asks, each worker pings Postgres at most
+    once per ``ttl``; concurrent probes wait for the same ping.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._result: dict[str, Any] | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def database(self) -> dict[str, Any]:
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    self._result = await ping_database()
+                    self._checked_at = time.monotonic()
+        return self._result  # type: ignore[return-value]
+
+    async def check(self) -> dict[str, Any]:
+        pool = pool_capacity()
+        # an exhausted pool would make the ping itself wait for pool_timeout
+        database = await self.database() if pool["ok"] else {"ok": False, "error": "skipped"}
+        return {
+            "ready": pool["ok"] and database["ok"],
+            "checks": {"database": database, "pool": pool},
+        }
+
+
+readiness = ReadinessProbe(ttl=settings.READINESS_CACHE_SECONDS)
@@ -0,0 +1,47 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core import db, metrics
+from app.core.pool_metrics import pool_snapshot
+from app.core.revocation import revocations
+from app.user.cache import user_cache
+from app.utils.deps import require_internal_access
+
+# operational data about this deployment, never public
+router = APIRouter(
+    tags=["internal"], include_in_schema=False, dependencies=[Depends(require_internal_access)]
+)
+
+
+@router.get("/pool", status_code=200)
+async def get_pool_stats() -> dict[str, Any]:
+    """Connection pool statistics for the worker serving the request."""
+    return pool_snapshot()
+
+
+@router.get("/replicas", status_code=200)
+async def get_replica_stats() -> list[dict[str, Any]]:
+    """Health and load of the read replicas as seen by this worker."""
+    return db.get_replica_set().stats()
+
+
+@router.get("/user-cache", status_code=200)
+async def get_user_cache_stats() -> dict[str, Any]:
+    """Authenticated-user cache counters for the worker serving the request."""
+    return user_cache.stats()
+
+
+@router.get("/revocations", status_code=200)
+async def get_revocation_stats() -> dict[str, Any]:
+    """Token revocation filter state for the worker serving the request."""
+    return revocations.stats()
+
+
+@router.get("/metrics", status_code=200, response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    """Prometheus metrics aggregated across the server's workers."""
+    return PlainTextResponse(
+        metrics.collect(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,10 +1,24 @@
-import sentry_sdk
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.routes import api_router
+from app.auth.route import well_known_router
+from app.health.route import router as health_router
+from app.internal.route import router as internal_router
+from app.core import hashing, keys, metrics, tracing
+from app.core.caching import HTTPCacheMiddleware, PrebuiltOpenAPI
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.profiling import ProfilingMiddleware, listen_for_control
+from app.core.responses import default_response_class
 from app.core.config import settings
+from app.auth.tokens import listen_for_revocations, sync_revocations_periodically
+from app.tasks import queue
+from app.user.cache import listen_for_invalidations
+from app.utils import Emailhandler
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -12,13 +26,49 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
-    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+    import sentry_sdk
+
+    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), traces_sample_rate=settings.SENTRY_TRACES_SAMPLE_RATE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    hashing.get_executor()
+    keys.init_signing()
+    openapi.build()
+    Emailhandler.precompile_templates()
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        queue.get_eager_executor()
+    background = [
+        asyncio.create_task(metrics.flush_periodically()),
+        asyncio.create_task(sync_revocations_periodically()),
+    ]
+    if settings.REDIS_URL:
+        background.append(asyncio.create_task(listen_for_invalidations()))
+        background.append(asyncio.create_task(listen_for_revocations()))
+        if settings.PROFILING_ENABLED:
+            background.append(asyncio.create_task(listen_for_control()))
+    if settings.TRACING_ENABLED:
+        background.append(asyncio.create_task(tracing.export_periodically()))
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    metrics.flush()
+    if settings.TRACING_ENABLED:
+        tracing.shutdown()
+    hashing.shutdown_executor()
+    queue.shutdown_eager_executor()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
-    debug=True,
+    lifespan=lifespan,
+    default_response_class=default_response_class(),
+    # debug renders tracebacks into 500 responses, keep it to local development
+    debug=settings.ENVIRONMENT == "local",
 )
 
 # Set all CORS enabled origins
@@ -32,4 +82,16 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
+app.add_middleware(HTTPCacheMiddleware)
+if settings.TRACING_ENABLED:
+    # inside InstrumentationMiddleware, so it reuses the resolved route
+    app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(InstrumentationMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+app.include_router(api_router, prefix=settings.API_V1_STR)
+app.include_router(internal_router, prefix="/internal")
+app.include_router(health_router)
+app.include_router(well_known_router)
+openapi = PrebuiltOpenAPI(app)
@@ -0,0 +1,35 @@
+"""Add users.is_superuser and the (created_at, id) keyset index
+
+Revision ID: 3f1a9c2b7d4e
+Revises: c25680826291
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2b7d4e'
+down_revision: Union[str, None] = 'c25680826291'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # users can be large, build the index without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id', 'users', ['created_at', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_column('users', 'is_superuser')
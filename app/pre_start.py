@@ -1,39 +1,110 @@
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
 
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from sqlalchemy import Engine
 from sqlmodel import Session, select
-from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryCallState, Retrying, stop_after_delay, wait_random_exponential
 
-from app.core.db import engine
+from app.core.config import settings
+from app.core.db import get_engine
+from app.utils import Emailhandler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-max_tries = 60 * 5  # 5 minutes
-wait_seconds = 1
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
 
 
-@retry(
-    stop=stop_after_attempt(max_tries),
-    wait=wait_fixed(wait_seconds),
-    before=before_log(logger, logging.INFO),
-    after=after_log(logger, logging.WARN),
-)
-def init(db_engine: Engine) -> None:
-    try:
-        with Session(db_engine) as session:
-            # Try to create session to check if DB is awake
-            session.exec(select(1))
-    except Exception as e:
-        logger.error(e)
-        raise e
+def check_database(db_engine: Engine) -> None:
+    with Session(db_engine) as session:
+        # Try to create session to check if DB is awake
+        session.exec(select(1))
+
+
+def check_migrations(db_engine: Engine, require_head: bool) -> None:
+    """The database revision must be one this code knows, and the head if required.
+
+    An unknown revision means the database was migrated by a newer release.
+    """
+    script = ScriptDirectory(str(MIGRATIONS_DIR))
+    heads = set(script.get_heads())
+    with db_engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    if current == heads:
+        return
+    known = {revision.revision for revision in script.walk_revisions()}
+    unknown = current - known
+    if unknown:
+        raise RuntimeError(f"database is at unknown revision(s) {sorted(unknown)}")
+    if require_head:
+        raise RuntimeError(f"database is at {sorted(current) or 'base'}, expected {sorted(heads)}")
+
+
+def check_smtp() -> None:
+    pool = Emailhandler.get_smtp_pool()
+    with pool.connection():
+        pass
+    pool.close()
+
+
+def retrying(name: str, max_wait: float) -> Retrying:
+    # full-jitter exponential backoff; only failed attempts are logged
+    def log_retry(state: RetryCallState) -> None:
+        error = state.outcome.exception() if state.outcome else None
+        summary = str(error).splitlines()[0] if error else ""
+        logger.warning(
+            f"{name} check failed (attempt {state.attempt_number}, "
+            f"{type(error).__name__}: {summary}), retrying in {state.upcoming_sleep:.1f}s"
+        )
+
+    return Retrying(
+        stop=stop_after_delay(max_wait),
+        wait=wait_random_exponential(multiplier=0.25, max=10),
+        before_sleep=log_retry,
+        reraise=True,
+    )
+
+
+def init(db_engine: Engine, *, require_head: bool = False, max_wait: float | None = None) -> None:
+    """Run every check concurrently, each retrying with its own backoff."""
+    max_wait = settings.PRESTART_MAX_WAIT_SECONDS if max_wait is None else max_wait
+    checks: dict[str, Callable[[], None]] = {
+        "database": lambda: check_database(db_engine),
+        "migrations": lambda: check_migrations(db_engine, require_head),
+    }
+    if settings.emails_enabled:
+        checks["smtp"] = check_smtp
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {name: executor.submit(retrying(name, max_wait), check) for name, check in checks.items()}
+        failed = []
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"{name} check gave up: {type(e).__name__}: {str(e).splitlines()[0]}")
+                failed.append(name)
+    if failed:
+        raise RuntimeError(f"pre-start checks failed: {', '.join(failed)}")
+    logger.info(f"pre-start checks passed: {', '.join(checks)}")
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Wait until the service's dependencies are up.")
+    parser.add_argument(
+        "--require-head",
+        action="store_true",
+        help="also wait until migrations are at head (for workers that do not run them)",
+    )
+    args = parser.parse_args()
     logger.info("Initializing service")
-    init(engine)
+    init(get_engine(), require_head=args.require_head)
     logger.info("Service finished initializing")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
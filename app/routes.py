@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from app.admin.route import router as admin_router
 from app.auth.route import router as auth_router
 from app.user.route import router as user_router
 
@@ -15,4 +16,10 @@ api_router.include_router(
     router = user_router,
     prefix="/user",
     tags=["user"]
-)
\ No newline at end of file
+)
+
+api_router.include_router(
+    router = admin_router,
+    prefix="/admin",
+    tags=["admin"]
+)
@@ -0,0 +1,231 @@
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from app.core import metrics
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+# seconds between checks of worker memory and exits
+CHECK_INTERVAL = 1.0
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """CPUs allowed by the container's CFS quota, None when unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def private_memory_mb(pid: int) -> float | None:
+    """Memory only this process uses; pages still shared with the master don't count."""
+    try:
+        lines = Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()
+    except OSError:
+        return None
+    kib = sum(int(line.split()[1]) for line in lines if line.startswith(("Private_Clean:", "Private_Dirty:")))
+    return kib / 1024
+
+
+def _event_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return "uvloop"
+
+
+def _http_protocol() -> str:
+    try:
+        import httptools  # noqa: F401
+    except ImportError:
+        return "h11"
+    return "httptools"
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Pre-fork supervisor around uvicorn, run with ``python -m app.server``.
+
+    The master binds the socket, imports the app once when preloading (so
+    workers share its pages copy-on-write) and keeps ``workers`` uvicorn
+    processes running: one that exits after SERVER_MAX_REQUESTS, or is
+    recycled for using more than SERVER_MAX_MEMORY_MB, is replaced. SIGTERM
+    or SIGINT drains every worker, each finishing its in-flight requests for
+    up to SERVER_GRACEFUL_TIMEOUT seconds.
+    """
+
+    def __init__(self, app: Any, sock: socket.socket, workers: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.loop = _event_loop()
+        self.http = _http_protocol()
+        self.children: dict[int, float] = {}  # pid -> start time
+        self.draining: set[int] = set()
+        self.stopping = False
+
+    def _serve(self) -> None:
+        import uvicorn
+
+        max_requests = None
+        if settings.SERVER_MAX_REQUESTS:
+            # jitter so workers started together do not all restart together
+            max_requests = settings.SERVER_MAX_REQUESTS + random.randint(
+                0, settings.SERVER_MAX_REQUESTS // 10
+            )
+        config = uvicorn.Config(
+            self.app,
+            loop=self.loop,
+            http=self.http,
+            lifespan="on",
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+            timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+            access_log=settings.SERVER_ACCESS_LOG,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            code = 0
+            try:
+                self._serve()
+            except BaseException:
+                logger.exception("worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"started worker {pid}")
+
+    def reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            self.draining.discard(pid)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info(f"worker {pid} exited with {code}")
+            try:
+                metrics.fold_exited(pid)
+            except OSError as e:
+                logger.warning(f"failed to fold metrics of worker {pid}: {e}")
+            if not self.stopping and code not in (0, -signal.SIGTERM) and time.monotonic() - started < 5:
+                # failing at startup: don't fork in a tight loop
+                time.sleep(1)
+
+    def recycle_bloated(self) -> None:
+        # one worker at a time, so capacity drops by at most one worker
+        if not settings.SERVER_MAX_MEMORY_MB or self.draining:
+            return
+        for pid in self.children:
+            used = private_memory_mb(pid)
+            if used is not None and used > settings.SERVER_MAX_MEMORY_MB:
+                logger.warning(f"worker {pid} uses {used:.0f}MB, recycling it")
+                self.draining.add(pid)
+                os.kill(pid, signal.SIGTERM)
+                return
+
+    def stop(self, signum: int, frame: Any) -> None:
+        if self.stopping:
+            return
+        logger.info(f"received {signal.Signals(signum).name}, draining workers")
+        self.stopping = True
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGTERM)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(
+            f"serving on {self.sock.getsockname()} with {self.workers} workers "
+            f"({self.loop}, {self.http}, preload={'off' if isinstance(self.app, str) else 'on'})"
+        )
+        metrics.reset_directory()
+        for _ in range(self.workers):
+            self.spawn()
+        deadline: float | None = None
+        while self.children:
+            time.sleep(CHECK_INTERVAL)
+            self.reap()
+            if self.stopping:
+                deadline = deadline or time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT + 5
+                if time.monotonic() > deadline:
+                    for pid in list(self.children):
+                        logger.warning(f"worker {pid} did not drain in time, killing it")
+                        os.kill(pid, signal.SIGKILL)
+                continue
+            self.recycle_bloated()
+            for _ in range(self.workers - len(self.children)):
+                self.spawn()
+        logger.info("all workers stopped")
+
+
+def main() -> None:
+    cpus = available_cpus()
+    workers = settings.WEB_CONCURRENCY or cpus
+    if "PASSWORD_HASH_PROCESSES" not in settings.model_fields_set:
+        # every worker has its own hashing pool; together they should fill the cpus once
+        settings.PASSWORD_HASH_PROCESSES = max(1, cpus // workers)
+    sock = bind(settings.SERVER_HOST, settings.SERVER_PORT, settings.SERVER_BACKLOG)
+    app: Any = APP
+    if settings.SERVER_PRELOAD:
+        # nothing in app.main connects or starts threads at import, that is left
+        # to the lifespan, which runs in each worker after the fork
+        from app.main import app
+    Supervisor(app, sock, workers).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
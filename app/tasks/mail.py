@@ -0,0 +1,79 @@
+import logging
+from smtplib import SMTPException
+
+from celery.utils.time import get_exponential_backoff_interval
+
+from app.core import security
+from app.core.config import settings
+from app.tasks.worker import celery_app
+from app.utils import Emailhandler
+
+logger = logging.getLogger(__name__)
+
+# eager retries run back-to-back on the one sending thread, ignoring the
+# backoff, so without a broker a failed email is logged and dropped instead
+_MAX_RETRIES = 0 if settings.CELERY_TASK_ALWAYS_EAGER else settings.EMAIL_TASK_MAX_RETRIES
+
+
+@celery_app.task(
+    name="email.send",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=settings.EMAIL_TASK_RETRY_BACKOFF_MAX,
+    retry_jitter=True,
+    max_retries=_MAX_RETRIES,
+    ignore_result=True,
+)
+def send_email(*, email_to: str, subject: str, html_content: str) -> None:
+    if not settings.emails_enabled:
+        logger.warning(f"emails are not configured, dropping email to {email_to}")
+        return
+    response = Emailhandler.send_email(
+        email_to=email_to, subject=subject, html_content=html_content
+    )
+    if not response.success:
+        raise response.error or SMTPException(
+            f"SMTP send failed: {response.status_code} {response.status_text}"
+        )
+
+
+@celery_app.task(
+    bind=True,
+    name="email.send_verification_batch",
+    max_retries=_MAX_RETRIES,
+    ignore_result=True,
+)
+def send_verification_emails(self, *, emails: list[str]) -> None:
+    """Render and send verification emails over one SMTP connection.
+
+    Tokens are minted here rather than at enqueue time so they are fresh when
+    delivered. Only the addresses that failed are retried.
+    """
+    if not settings.emails_enabled:
+        logger.warning(f"emails are not configured, dropping {len(emails)} verification emails")
+        return
+    messages = []
+    for email in emails:
+        token = security.create_email_verification_token(email)
+        messages.append((
+            email,
+            Emailhandler.generate_new_account_email(
+                email_to=email,
+                verification_link=f"{settings.FRONTEND_HOST}/verify-email?token={token}",
+            ),
+        ))
+    countdown = get_exponential_backoff_interval(
+        factor=1,
+        retries=self.request.retries,
+        maximum=settings.EMAIL_TASK_RETRY_BACKOFF_MAX,
+        full_jitter=True,
+    )
+    try:
+        responses = Emailhandler.send_many(messages=messages)
+    except Exception as e:
+        raise self.retry(exc=e, countdown=countdown)
+    failed = [email for (email, _), response in zip(messages, responses) if not response.success]
+    if failed:
+        logger.warning(f"{len(failed)}/{len(emails)} verification emails failed, retrying")
+        raise self.retry(kwargs={"emails": failed}, countdown=countdown)
+
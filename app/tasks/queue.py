@@ -0,0 +1,82 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.tracing import propagation_headers, span
+from app.utils.Emailhandler import EmailData
+
+logger = logging.getLogger(__name__)
+
+# Celery and the task modules are imported on first enqueue, so importing the
+# API does not pay for them.
+
+# without a broker Celery runs tasks eagerly in this process; they get a
+# thread of their own so SMTP does not hold up the request that queued them
+_eager_executor: ThreadPoolExecutor | None = None
+
+
+def get_eager_executor() -> ThreadPoolExecutor:
+    global _eager_executor
+    if _eager_executor is None:
+        logger.warning("no Celery broker configured, emails are sent from the API process")
+        # one sender, so a bulk import does not open an SMTP connection per email
+        _eager_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eager-task")
+    return _eager_executor
+
+
+def shutdown_eager_executor() -> None:
+    """Wait for emails already handed to the eager thread."""
+    global _eager_executor
+    if _eager_executor is not None:
+        _eager_executor.shutdown(wait=True)
+        _eager_executor = None
+
+
+def _log_failure(future: Future) -> None:
+    # an eager apply_async stores the task's exception on its EagerResult
+    # rather than raising it, unless task_eager_propagates is set
+    error = future.exception()
+    if error is None:
+        result = future.result()
+        if result.failed():
+            error = result.result
+    if error is not None:
+        logger.error(f"eager task failed: {error!r}")
+
+
+async def _apply(task: Any, kwargs: dict[str, Any]) -> None:
+    # the worker continues this request's trace; so does the eager thread,
+    # which starts without this request's contextvars
+    headers = propagation_headers()
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        future = get_eager_executor().submit(task.apply_async, kwargs=kwargs, headers=headers)
+        future.add_done_callback(_log_failure)
+        return
+    await run_in_threadpool(task.apply_async, kwargs=kwargs, headers=headers)
+
+
+async def enqueue_email(*, email_to: str, email_data: EmailData) -> None:
+    """Queue an email for delivery by the worker and return immediately."""
+    from app.tasks import mail
+
+    with span("celery.enqueue", **{"celery.task": mail.send_email.name}):
+        await _apply(
+            mail.send_email,
+            {
+                "email_to": email_to,
+                "subject": email_data.subject,
+                "html_content": email_data.html_content,
+            },
+        )
+
+
+async def enqueue_verification_emails(*, emails: list[str]) -> None:
+    """Queue verification emails for a batch of new users."""
+    from app.tasks import mail
+
+    if emails:
+        with span("celery.enqueue", **{"celery.task": mail.send_verification_emails.name}):
+            await _apply(mail.send_verification_emails, {"emails": emails})
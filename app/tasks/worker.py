@@ -0,0 +1,48 @@
+from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init
+
+from app.core.config import settings
+
+celery_app = Celery(
+    settings.PROJECT_NAME,
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.mail"],
+)
+
+celery_app.conf.update(
+    accept_content=settings.CELERY_ACCEPT_CONTENT,
+    task_serializer=settings.CELERY_TASK_SERIALIZER,
+    result_serializer=settings.CELERY_RESULT_SERIALIZER,
+    timezone=settings.CELERY_TIMEZONE,
+    enable_utc=settings.CELERY_ENABLE_UTC,
+    task_track_started=settings.CELERY_TASK_TRACK_STARTED,
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    # a worker that dies mid-send leaves the message on the broker
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+)
+
+
+@worker_process_init.connect
+def _precompile_email_templates(**kwargs) -> None:
+    from app.utils import Emailhandler
+
+    Emailhandler.precompile_templates()
+
+
+if settings.TRACING_ENABLED:
+
+    @task_prerun.connect
+    def _start_task_trace(task_id, task, **kwargs) -> None:
+        from app.core import tracing
+
+        traceparent = task.request.get("traceparent") or (task.request.headers or {}).get("traceparent")
+        tracing.task_started(task_id, task.name, traceparent)
+
+    @task_postrun.connect
+    def _finish_task_trace(task_id, task, retval=None, state=None, **kwargs) -> None:
+        from app.core import tracing
+
+        tracing.task_finished(task_id, state, retval)
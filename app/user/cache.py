@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.replicas import recent_writes
+from app.user.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Bounded LRU of authenticated users with a per-entry TTL.
+
+    Entries are stored as plain dicts and rebuilt into a fresh ``User`` on every
+    hit, so a cached user is never shared between requests or sessions.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[UUID, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, user_id: UUID) -> User | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return User(**data)
+
+    def set(self, user: User) -> None:
+        if not self.enabled:
+            return
+        self._entries[user.id] = (time.monotonic() + self.ttl, user.model_dump())
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id: UUID) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+async def invalidate_user(user_id: UUID) -> None:
+    """Drop a user from this worker's cache and, with Redis, from the others.
+
+    Called after every write to a user, so it also opens that user's
+    read-your-writes window.
+    """
+    user_cache.discard(user_id)
+    recent_writes.note(user_id)
+    if not settings.REDIS_URL:
+        return
+    from redis.asyncio import Redis
+
+    try:
+        async with Redis.from_url(settings.REDIS_URL) as redis:
+            await redis.publish(settings.USER_CACHE_INVALIDATION_CHANNEL, str(user_id))
+    except Exception as e:
+        # the TTL still bounds staleness on the other workers
+        logger.warning(f"failed to publish user cache invalidation: {e}")
+
+
+async def listen_for_invalidations() -> None:
+    """Apply invalidations published by other workers until cancelled."""
+    from redis.asyncio import Redis
+
+    while True:
+        try:
+            async with Redis.from_url(settings.REDIS_URL) as redis:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.USER_CACHE_INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            user_id = UUID(message["data"].decode())
+                        except ValueError:
+                            continue
+                        user_cache.discard(user_id)
+                        recent_writes.note(user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # entries published while disconnected are lost, start clean
+            logger.warning(f"user cache invalidation listener failed: {e}")
+            user_cache.clear()
+            await asyncio.sleep(1)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from pydantic import EmailStr
-from sqlalchemy import String
+from sqlalchemy import Index, String, false
 from sqlmodel import Field, SQLModel
 
 class UserBase(SQLModel):
@@ -29,10 +29,19 @@ class NewPassword(SQLModel):
     
 class UserData(SQLModel):
     email: EmailStr
+
+class UserPublic(SQLModel):
+    id: uuid.UUID
+    email: EmailStr
+    created_at: datetime
+    is_active: bool
+    is_verified: bool
     
 class Token(SQLModel):
     access_token: str
     token_type: str = Field(default="bearer")
+    refresh_token: str | None = None
+    expires_in: int | None = None  # seconds until the access token expires
     
 class RefreshToken(SQLModel):
     refresh_token: str
@@ -40,13 +49,32 @@ class RefreshToken(SQLModel):
     
 class TokenPayload(SQLModel):
     sub: str
+    # login session, checked against revocations; tokens minted before
+    # sessions existed have none and can't be revoked, so they are refused
+    sid: uuid.UUID
     
 class User(UserBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str = Field(
         max_length=128, sa_type=String(128), nullable=False
     )  
+    is_superuser: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
     __tablename__ = "users"
-    
+    __table_args__ = (
+        # keyset pagination order, see app.utils.paginator.CursorPaginator
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
-    
\ No newline at end of file
+
+class RefreshSession(SQLModel, table=True):
+    """One issued refresh token. Rotation chains them into a family per login,
+    and access tokens carry the family id so revoking it logs the session out."""
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    family_id: uuid.UUID = Field(index=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True, ondelete="CASCADE")
+    token_hash: str = Field(unique=True, index=True, max_length=64, sa_type=String(64))
+    created_at: datetime = Field(default_factory=datetime.now)
+    expires_at: datetime
+    used_at: datetime | None = None
+    revoked_at: datetime | None = Field(default=None, index=True)
+    __tablename__ = "refresh_sessions"
@@ -1,27 +1,43 @@
 from fastapi import APIRouter, Depends
+from app.core import ratelimit
+from app.core.instrumentation import query_budget
+from app.core.responses import prevalidated
 from app.models import Message
 from app.user.models import UpdatePassword, UserData
-from app.utils.deps import CurrentUser, SessionDep
+from app.utils.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    current_user_not_modified,
+    get_current_user,
+)
 from app.user import service
 
 router = APIRouter(tags=["user"])
 
-@router.put("/update-password", status_code=200, response_model=Message)
-def update_password(
+@router.put(
+    "/update-password",
+    status_code=200,
+    response_model=Message,
+    dependencies=[Depends(ratelimit.limit_by_account("update_password", get_current_user))],
+)
+async def update_password(
     password: UpdatePassword,
     current_user: CurrentUser,
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Message:
     """Update user password."""
-    service.update_password(session=session, user_id=current_user.id, password=password)
-    return Message(message="Password updated successfully.")
+    await service.update_password(session=session, user_id=current_user.id, password=password)
+    return prevalidated(Message(message="Password updated successfully."))
 
-@router.get("/me", status_code=200, response_model=UserData)
-def get_current_user_data(
-    current_user: CurrentUser,
-    session: SessionDep
-) -> UserData:
+@router.get(
+    "/me",
+    status_code=200,
+    response_model=UserData,
+    # the user row itself, and nothing while it is cached
+    dependencies=[Depends(query_budget(1)), Depends(current_user_not_modified)],
+)
+async def get_current_user_data(current_user: CurrentUser) -> UserData:
     """Get current user data."""
-    return service.get_current_user(session=session, user_id=current_user.id)
+    return prevalidated(UserData(email=current_user.email))
 
 
@@ -1,17 +1,28 @@
+import atexit
 import logging
-from dataclasses import dataclass
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterator
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.core.instrumentation import SMTP_SEND_LATENCY, timed
+from app.core.tracing import span
 
+if TYPE_CHECKING:
+    from emails.backend.smtp import SMTPBackend  # type: ignore
+    from jinja2 import Environment
+
+# emails and jinja2 are imported on first use, they are not needed to boot a worker
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,26 +31,46 @@ class EmailData:
     html_content: str
     subject: str
     
+TEMPLATES_DIR = Path(__file__).parent.parent / "email-templates" / "build"
+
+_template_env: "Environment | None" = None
+
+
+def get_template_env() -> "Environment":
+    """Shared Jinja environment; compiled templates are cached on it."""
+    global _template_env
+    if _template_env is None:
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+        auto_reload = settings.EMAIL_TEMPLATES_AUTO_RELOAD
+        if auto_reload is None:
+            auto_reload = settings.ENVIRONMENT == "local"
+        bytecode_cache = None
+        if settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR:
+            Path(settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR)
+        _template_env = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            auto_reload=auto_reload,
+            bytecode_cache=bytecode_cache,
+            cache_size=-1,
+        )
+    return _template_env
+
+
+def precompile_templates() -> None:
+    """Compile every email template up front so the first send pays nothing."""
+    env = get_template_env()
+    for template_name in env.list_templates(extensions=["html"]):
+        env.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent.parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = get_template_env().get_template(template_name).render(context)
     return html_content
 
 
-def send_email(
-    *,
-    email_to: str,
-    subject: str = "",
-    html_content: str = "",
-) -> None:
-    assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
+def _smtp_options() -> dict[str, Any]:
     smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
     if settings.SMTP_TLS:
         smtp_options["tls"] = True
@@ -49,8 +80,189 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    smtp_options["timeout"] = settings.SMTP_TIMEOUT
+    return smtp_options
+
+
+@dataclass
+class _PooledConnection:
+    backend: "SMTPBackend"
+    last_used: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.backend._client is not None
+
+    def close(self) -> None:
+        self.backend.close()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """Reuse authenticated SMTP connections across sends.
+
+    Connections are opened lazily, probed with NOOP when they have been idle
+    for a while, dropped after ``max_idle`` seconds or ``max_messages`` sends,
+    and reopened transparently when the server hangs up.
+    """
+
+    NOOP_AFTER_SECONDS = 5.0
+
+    def __init__(
+        self,
+        *,
+        size: int,
+        max_idle: float,
+        max_messages: int,
+        **smtp_options: Any,
+    ) -> None:
+        self.size = size
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.smtp_options = smtp_options
+        self.connects = 0
+        self._idle: deque[_PooledConnection] = deque()
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def _checkout(self) -> _PooledConnection:
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        from emails.backend.smtp import SMTPBackend  # type: ignore
+
+        return _PooledConnection(backend=SMTPBackend(**self.smtp_options))
+
+    def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _ensure_healthy(self, conn: _PooledConnection) -> None:
+        if not conn.is_open:
+            return
+        idle_for = time.monotonic() - conn.last_used
+        if idle_for > self.max_idle:
+            conn.close()
+        elif idle_for > self.NOOP_AFTER_SECONDS:
+            try:
+                healthy = conn.backend._client.noop()[0] == 250
+            except Exception:
+                healthy = False
+            if not healthy:
+                conn.close()
+
+    def _ensure_open(self, conn: _PooledConnection) -> None:
+        if conn.messages_sent >= self.max_messages:
+            conn.close()
+        if not conn.is_open:
+            conn.backend.get_client()
+            self.connects += 1
+
+    @contextmanager
+    def connection(self) -> Iterator[_PooledConnection]:
+        conn = self._checkout()
+        try:
+            self._ensure_healthy(conn)
+            self._ensure_open(conn)
+            yield conn
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            self._checkin(conn)
+
+    def send(self, conn: _PooledConnection, message: Any, email_to: str) -> Any:
+        self._ensure_open(conn)
+        response = message.send(to=email_to, smtp=conn.backend)
+        conn.messages_sent += 1
+        if not response.success:
+            # the connection may be in an unknown state after a failure
+            conn.close()
+        return response
+
+    def close(self) -> None:
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+            self._created = 0
+
+
+_smtp_pool: SMTPConnectionPool | None = None
+_smtp_pool_pid: int | None = None
+_smtp_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Pool for the current process, recreated after a fork."""
+    global _smtp_pool, _smtp_pool_pid
+    with _smtp_pool_lock:
+        if _smtp_pool is None or _smtp_pool_pid != os.getpid():
+            _smtp_pool = SMTPConnectionPool(
+                size=settings.SMTP_POOL_SIZE,
+                max_idle=settings.SMTP_POOL_MAX_IDLE_SECONDS,
+                max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                **_smtp_options(),
+            )
+            _smtp_pool_pid = os.getpid()
+        return _smtp_pool
+
+
+@atexit.register
+def _close_smtp_pool() -> None:
+    if _smtp_pool is not None and _smtp_pool_pid == os.getpid():
+        _smtp_pool.close()
+
+
+def _build_message(subject: str, html_content: str) -> Any:
+    import emails  # type: ignore
+
+    return emails.Message(
+        subject=subject,
+        html=html_content,
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+
+
+def send_email(
+    *,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> Any:
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    message = _build_message(subject, html_content)
+    pool = get_smtp_pool()
+    with span("smtp.send") as send_span, timed(SMTP_SEND_LATENCY, "smtp_seconds", operation="send"), \
+            pool.connection() as conn:
+        response = pool.send(conn, message, email_to)
+        if send_span is not None:
+            send_span.set(**{"smtp.status_code": response.status_code})
+            if not response.success:
+                send_span.error = f"SMTP {response.status_code}"
     logger.info(f"send email result: {response}")
+    return response
+
+
+def send_many(*, messages: list[tuple[str, EmailData]]) -> list[Any]:
+    """Send several emails back to back over a single pooled connection."""
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    pool = get_smtp_pool()
+    responses = []
+    with span("smtp.send_many", **{"smtp.messages": len(messages)}) as send_span, \
+            timed(SMTP_SEND_LATENCY, "smtp_seconds", operation="send_many"), pool.connection() as conn:
+        for email_to, email_data in messages:
+            message = _build_message(email_data.subject, email_data.html_content)
+            responses.append(pool.send(conn, message, email_to))
+        if send_span is not None:
+            send_span.set(**{"smtp.failed": sum(not r.success for r in responses)})
+    logger.info(f"send_many sent {sum(bool(r.success) for r in responses)}/{len(responses)} emails")
+    return responses
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -1,16 +1,23 @@
-import jwt
+import hmac
+import uuid
+
 from pydantic import ValidationError
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import get_async_session_maker, get_engine, get_read_session_maker
 from jwt.exceptions import InvalidTokenError
 from fastapi import status
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
-from typing import Annotated, Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, AsyncGenerator, Generator
 from typing_extensions import Self
 
-from app.core.security import ALGORITHM
+from app.auth import tokens
+from app.core.caching import check_not_modified, make_etag
+from app.core.revocation import revocations
+from app.core.security import decode_access_token
+from app.user.cache import user_cache
 from app.user.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -19,25 +26,79 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_maker()() as session:
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_read_session_maker()() as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+# read-only work, routed to a replica when configured
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
-def get_current_user(session: SessionDep ,token: TokenDep) -> User:
+async def get_current_user(session: ReadSessionDep, token: TokenDep) -> User:
     try:
-       payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+       payload = decode_access_token(token)
        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+       user_id = uuid.UUID(token_data.sub)
+    except (InvalidTokenError, ValidationError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # read-your-writes: recent writers are served by the primary
+    session.info["user_id"] = user_id
+    # the filter answers "not revoked" from memory for nearly every request
+    if revocations.might_be_revoked(token_data.sid):
+        if await tokens.is_session_revoked(session_id=token_data.sid):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_cache.set(user)
     return user
 
-CurrentUser = Annotated[User, Depends(get_current_user)]
\ No newline at end of file
+CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
+async def get_current_admin(current_user: CurrentUser) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return current_user
+
+CurrentAdmin = Annotated[User, Depends(get_current_admin)]
+
+
+async def require_internal_access(session: ReadSessionDep, token: TokenDep) -> None:
+    """The static INTERNAL_API_TOKEN (for Prometheus) or an admin's access token."""
+    if settings.INTERNAL_API_TOKEN and hmac.compare_digest(
+        token.encode(), settings.INTERNAL_API_TOKEN.encode()
+    ):
+        return
+    await get_current_admin(await get_current_user(session, token))
+
+
+async def current_user_not_modified(request: Request, current_user: CurrentUser) -> None:
+    """304 for reads of the current user when their row has not changed."""
+    check_not_modified(
+        request,
+        make_etag("user", current_user.id, current_user.email, current_user.updated_at),
+    )
@@ -1,12 +1,23 @@
-from typing import List, TypeVar, Generic
+import base64
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Sequence, TypeVar, Generic
 from math import ceil
+from fastapi import HTTPException
 from pydantic import BaseModel
-from pydantic.generics import GenericModel
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
 
 T = TypeVar("T")
 
 
-class Pagination(GenericModel, Generic[T]):
+class Pagination(BaseModel, Generic[T]):
     page: int
     size: int
     total: int
@@ -42,3 +53,111 @@ class Paginator:
         start = self.offset
         end = start + self.size
         return items[start:end]
+
+
+class CursorPage(BaseModel, Generic[T]):
+    size: int
+    next_cursor: str | None
+    total: int | None = None
+    total_is_estimate: bool = False
+    results: List[T]
+
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _from_json(column: ColumnElement, value: Any) -> Any:
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return value
+
+
+class CursorPaginator:
+    """Keyset pagination over an ordered, unique tuple of indexed columns.
+
+    Each page seeks past the last row of the previous one with a row-value
+    comparison, so page N costs the same as page 1. The position travels in an
+    opaque cursor signed with ``SECRET_KEY`` so clients cannot forge it.
+    """
+
+    def __init__(self, keys: Sequence[Any], cursor: str | None = None, size: int = 10):
+        self.keys = list(keys)
+        self.size = max(size, 1)
+        self.after = self.decode_cursor(cursor) if cursor else None
+
+    def encode_cursor(self, values: Sequence[Any]) -> str:
+        payload = base64.urlsafe_b64encode(
+            json.dumps([_to_json(v) for v in values], separators=(",", ":")).encode()
+        ).decode().rstrip("=")
+        return f"{payload}.{_sign(payload.encode())}"
+
+    def decode_cursor(self, cursor: str) -> list[Any]:
+        payload, _, signature = cursor.partition(".")
+        if not hmac.compare_digest(_sign(payload.encode()), signature):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        try:
+            values = json.loads(_b64decode(payload))
+            if len(values) != len(self.keys):
+                raise ValueError(values)
+            return [_from_json(key, value) for key, value in zip(self.keys, values)]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def apply(self, statement: Select) -> Select:
+        if self.after is not None:
+            statement = statement.where(tuple_(*self.keys) > tuple_(*self.after))
+        # one extra row tells us whether there is a next page
+        return statement.order_by(*self.keys).limit(self.size + 1)
+
+    def page(self, rows: Sequence[Any], *, total: int | None = None, total_is_estimate: bool = False) -> CursorPage:
+        rows = list(rows)
+        next_cursor = None
+        if len(rows) > self.size:
+            rows = rows[: self.size]
+            last = rows[-1]
+            next_cursor = self.encode_cursor([getattr(last, key.key) for key in self.keys])
+        return CursorPage(
+            size=self.size,
+            next_cursor=next_cursor,
+            total=total,
+            total_is_estimate=total_is_estimate,
+            results=rows,
+        )
+
+
+async def exact_count(session: AsyncSession, statement: Select) -> int:
+    count_statement = select(func.count()).select_from(statement.order_by(None).subquery())
+    return await session.scalar(count_statement)
+
+
+async def estimated_count(session: AsyncSession, table_name: str) -> int | None:
+    """Row estimate from the planner statistics instead of scanning with COUNT(*).
+
+    Only meaningful for unfiltered listings; returns ``None`` when the table
+    has never been analyzed or the database is not Postgres.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    result = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name},
+    )
+    estimate = result.scalar_one_or_none()
+    return estimate if estimate is not None and estimate >= 0 else None
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.instrumentation import RequestStats, request_observers
+
+
+@contextmanager
+def capture_requests() -> Iterator[list[RequestStats]]:
+    """Collect the stats of every request the app finishes inside the block."""
+    captured: list[RequestStats] = []
+    request_observers.append(captured.append)
+    try:
+        yield captured
+    finally:
+        request_observers.remove(captured.append)
+
+
+@contextmanager
+def assert_max_queries(
+    limit: int | None = None, *, route: str | None = None
+) -> Iterator[list[RequestStats]]:
+    """Fail when a request (to ``route``, if given) runs more than ``limit`` statements.
+
+    Without ``limit`` each request is held to its route's query_budget(), and
+    requests to routes without one are not checked.
+
+        with assert_max_queries(route="user-get_current_user_data"):
+            client.get("/api/v1/user/me", headers=headers)
+    """
+    with capture_requests() as captured:
+        yield captured
+    requests = [stats for stats in captured if route is None or stats.route == route]
+    if route is not None and not requests:
+        raise AssertionError(f"no request to {route} was made")
+    for stats in requests:
+        budget = limit if limit is not None else stats.query_budget
+        if budget is not None and stats.db_queries > budget:
+            statements = "\n".join(f"  {statement}" for statement, _ in stats.queries)
+            raise AssertionError(
+                f"{stats.route} executed {stats.db_queries} queries, limit is {budget}:\n{statements}"
+            )
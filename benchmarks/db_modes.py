@@ -0,0 +1,173 @@
+"""Compare requests/sec of the real endpoints on the sync and async database stacks.
+
+The sync stack is no longer in the tree, so it is benchmarked from a git
+revision that still has it: that revision is checked out into a temporary
+worktree and both apps are served by uvicorn, one after the other, against
+the configured Postgres (which must be migrated to this tree's head). One
+seeded user calls the real ``/user/me`` with a bearer token; in the sync app
+every request holds an AnyIO threadpool slot while it waits on Postgres.
+
+    python -m benchmarks.db_modes --sync-rev <revision before the async stack> \\
+        --requests 5000 --concurrency 100
+
+Tokens are signed with SECRET_KEY (HS256), so JWT_KEYS_DIR must be unset.
+The user cache is disabled so every request reads the database, which is
+what the two stacks differ in. Pool settings (DB_POOL_SIZE, DB_MAX_OVERFLOW)
+are passed to both apps; the async one gets slower as the pool grows past
+what Postgres can run at once.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import jwt
+from sqlmodel import Session
+
+from app.core import security
+from app.core.db import get_engine
+from app.user.models import User
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_user() -> uuid.UUID:
+    with Session(get_engine()) as session:
+        user = User(
+            email=f"db-modes-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password=security.get_password_hash("db-modes-password"),
+            is_verified=True,
+        )
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def bearer(secret_key: str, user_id: uuid.UUID) -> dict[str, str]:
+    # the current app requires a session id, older revisions ignore it; a
+    # random one is never in the revocation filter, so no lookup happens
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    claims = {"sub": str(user_id), "exp": expires, "sid": str(uuid.uuid4())}
+    token = jwt.encode(claims, secret_key, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with {process.returncode}")
+            try:
+                await client.get("/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start in time")
+
+
+async def drive(
+    base_url: str, path: str, headers: dict[str, str], *, requests: int, concurrency: int
+) -> tuple[float, int]:
+    """Fire ``requests`` calls with at most ``concurrency`` in flight, return req/s and errors.
+
+    Errors are counted rather than raised: a sync app whose threads outnumber
+    its connection pool answers 500 once pool_timeout passes. When most
+    requests fail the rate measures error responses, and that raises.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as client:
+
+        async def one() -> None:
+            nonlocal errors
+            async with semaphore:
+                try:
+                    response = await client.get(path)
+                except httpx.TransportError:
+                    errors += 1
+                    return
+                errors += not response.is_success
+
+        # warm up the pools before timing
+        await asyncio.gather(*(one() for _ in range(min(concurrency, requests))))
+        errors = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    if errors * 2 > requests:
+        raise RuntimeError(f"{errors}/{requests} requests to {path} failed, the req/s is not valid")
+    return requests / elapsed, errors
+
+
+def serve(
+    tree: Path, env: dict[str, str], args: argparse.Namespace, headers: dict[str, str]
+) -> tuple[float, int]:
+    port = free_port()
+    # run from the tree so `app` is imported from it
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "critical"],
+        cwd=tree,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_ready(base_url, server))
+        return asyncio.run(
+            drive(base_url, args.path, headers, requests=args.requests, concurrency=args.concurrency)
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sync-rev", required=True, help="a revision that still has the sync stack")
+    parser.add_argument("--path", default="/api/v1/user/me")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    secret_key = os.environ.get("SECRET_KEY") or uuid.uuid4().hex * 2
+    env = {**os.environ, "SECRET_KEY": secret_key, "USER_CACHE_TTL_SECONDS": "0"}
+    env.pop("PYTHONPATH", None)
+    headers = bearer(secret_key, seed_user())
+
+    worktree = Path(tempfile.mkdtemp(prefix="db-modes-")) / "sync"
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", str(worktree), args.sync_rev],
+        cwd=ROOT, check=True, capture_output=True,
+    )
+    try:
+        results = {
+            "sync": serve(worktree, env, args, headers),
+            "async": serve(ROOT, env, args, headers),
+        }
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=ROOT, check=False)
+        shutil.rmtree(worktree.parent, ignore_errors=True)
+
+    for mode, (rps, errors) in results.items():
+        print(f"{mode:>5}: {rps:10.1f} req/s {errors:6d} errors  GET {args.path}")
+
+
+if __name__ == "__main__":
+    main()
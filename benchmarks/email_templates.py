@@ -0,0 +1,51 @@
+"""Microbenchmark of email template rendering before and after caching.
+
+``uncached`` reproduces the old ``render_email_template``: read the file and
+compile a fresh ``jinja2.Template`` per call. ``cached`` goes through the
+shared environment used by ``Emailhandler`` today.
+
+    python -m benchmarks.email_templates --iterations 2000
+"""
+import argparse
+import timeit
+
+from jinja2 import Template
+
+from app.utils import Emailhandler
+
+CONTEXT = {
+    "project_name": "bench",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "valid_hours": 1,
+    "link": "http://localhost/verify-email?token=abc",
+}
+
+
+def render_uncached(template_name: str) -> str:
+    template_str = (Emailhandler.TEMPLATES_DIR / template_name).read_text()
+    return Template(template_str).render(CONTEXT)
+
+
+def render_cached(template_name: str) -> str:
+    return Emailhandler.render_email_template(template_name=template_name, context=CONTEXT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    Emailhandler.precompile_templates()
+    for template_name in ("new_account.html", "reset_password.html"):
+        assert render_uncached(template_name) == render_cached(template_name)
+        for name, render in (("uncached", render_uncached), ("cached", render_cached)):
+            seconds = timeit.timeit(lambda: render(template_name), number=args.iterations)
+            print(
+                f"{template_name:>20} {name:>8}: "
+                f"{seconds / args.iterations * 1e6:9.1f} us/render"
+            )
+
+
+if __name__ == "__main__":
+    main()
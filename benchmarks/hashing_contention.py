@@ -0,0 +1,63 @@
+"""Measure event-loop latency while a burst of bcrypt work is in flight.
+
+A cheap coroutine (standing in for ``/user/me``) is timed repeatedly while
+``--burst`` password verifications run either in the AnyIO threadpool, where
+bcrypt competes for the GIL with the loop, or in the hashing process pool.
+
+    python -m benchmarks.hashing_contention --burst 32 --probes 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import hashing, security
+from app.user.models import UserData
+
+
+async def probe_latencies(probes: int, stop: asyncio.Event) -> list[float]:
+    latencies: list[float] = []
+    while len(latencies) < probes and not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0)
+        UserData(email="probe@example.com").model_dump_json()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.001)
+    return latencies
+
+
+async def run(mode: str, *, burst: int, probes: int) -> list[float]:
+    hashed = security.get_password_hash("benchmark-password")
+    if mode == "threads":
+        verify = lambda: run_in_threadpool(security.verify_password, "wrong", hashed)  # noqa: E731
+    else:
+        verify = lambda: hashing.verify_password("wrong", hashed)  # noqa: E731
+        await verify()  # start the worker processes outside the measurement
+
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_latencies(probes, stop))
+    await asyncio.gather(*(verify() for _ in range(burst)))
+    stop.set()
+    return await prober
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--burst", type=int, default=32)
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+
+    for mode in ("threads", "processes"):
+        latencies = sorted(asyncio.run(run(mode, burst=args.burst, probes=args.probes)))
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+        print(
+            f"{mode:>9}: probes={len(latencies):4d} "
+            f"median={statistics.median(latencies) * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms"
+        )
+        hashing.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
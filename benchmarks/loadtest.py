@@ -0,0 +1,361 @@
+"""Reproducible HTTP load test for the auth and user endpoints.
+
+Starts the app under uvicorn against Postgres (the configured POSTGRES_*
+database, which must already be migrated) or a throwaway SQLite file, points
+email delivery at a local SMTP sink, seeds users, then drives
+``/auth/register``, ``/auth/login``, ``/auth/verify-email`` and ``/user/me``
+with a weighted mix at a fixed concurrency. Throughput and latency
+percentiles are written as JSON so runs can be compared across commits.
+
+    python -m benchmarks.loadtest --db sqlite --duration 30 --concurrency 50 \\
+        --mix me=8,login=1,register=0.5,verify=0.5 --output bench_output.json
+
+SQLite mode needs ``aiosqlite`` installed alongside the app dependencies.
+Rate limiting is disabled in the server it starts: a few clients replaying
+logins from one IP is exactly what the limits are there to stop. The run
+exits non-zero when most requests of a scenario fail, since its figures
+would then describe error responses, and when any request ran more
+queries than its route's query budget.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.smtp_sink import SMTPSink
+
+SCENARIOS = ("register", "login", "verify", "me")
+SEED_PASSWORD = "loadtest-password"
+
+
+@dataclass
+class Fixtures:
+    logins: list[str] = field(default_factory=list)
+    access_tokens: list[str] = field(default_factory=list)
+    verify_tokens: deque[str] = field(default_factory=deque)
+
+
+@dataclass
+class Sample:
+    scenario: str
+    seconds: float
+    ok: bool
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {SCENARIOS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(*, sqlite_path: str | None, users: int, unverified: int) -> Fixtures:
+    """Insert seed users directly and mint the tokens the scenarios need."""
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from app.core import security
+    from app.core.config import settings
+    from app.user.models import RefreshSession, User
+
+    if sqlite_path:
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        SQLModel.metadata.create_all(engine)
+    else:
+        engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+    run_id = uuid.uuid4().hex[:8]
+    hashed_password = security.get_password_hash(SEED_PASSWORD)
+    fixtures = Fixtures()
+    with Session(engine) as session:
+        for i in range(users + unverified):
+            verified = i < users
+            user = User(
+                email=f"seed-{run_id}-{i}@example.com",
+                hashed_password=hashed_password,
+                is_verified=verified,
+            )
+            session.add(user)
+            if verified:
+                # a login session per user, as /auth/login would have created
+                login = RefreshSession(
+                    family_id=uuid.uuid4(),
+                    user_id=user.id,
+                    token_hash=hashlib.sha256(secrets.token_bytes(32)).hexdigest(),
+                    expires_at=datetime.now() + timedelta(days=1),
+                )
+                session.add(login)
+                fixtures.logins.append(user.email)
+                fixtures.access_tokens.append(
+                    security.create_access_token(
+                        user.id, timedelta(hours=1), session_id=login.family_id
+                    )
+                )
+            else:
+                fixtures.verify_tokens.append(security.create_email_verification_token(user.email))
+        session.commit()
+    engine.dispose()
+    return fixtures
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            try:
+                if (await client.get("/healthz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+async def one_request(client: httpx.AsyncClient, scenario: str, fixtures: Fixtures) -> bool:
+    api = "/api/v1"
+    if scenario == "verify" and not fixtures.verify_tokens:
+        scenario = "me"
+    if scenario == "register":
+        response = await client.post(
+            f"{api}/auth/register",
+            json={"email": f"lt-{uuid.uuid4().hex}@example.com", "password": SEED_PASSWORD},
+        )
+        return response.status_code == 201
+    if scenario == "login":
+        response = await client.post(
+            f"{api}/auth/login",
+            data={"username": random.choice(fixtures.logins), "password": SEED_PASSWORD},
+        )
+    elif scenario == "verify":
+        response = await client.post(
+            f"{api}/auth/verify-email", params={"token": fixtures.verify_tokens.popleft()}
+        )
+    else:
+        response = await client.get(
+            f"{api}/user/me",
+            headers={"Authorization": f"Bearer {random.choice(fixtures.access_tokens)}"},
+        )
+    return response.status_code == 200
+
+
+async def over_budget_requests(base_url: str, token: str) -> dict[str, float]:
+    """Requests per route that ran more queries than the route's query_budget()."""
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get(
+            "/internal/metrics", headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+    counts: dict[str, float] = {}
+    for line in response.text.splitlines():
+        if line.startswith("db_query_budget_exceeded_total{"):
+            labels, _, value = line.rpartition(" ")
+            route = labels.split('route="', 1)[1].split('"', 1)[0]
+            counts[route] = float(value)
+    return counts
+
+
+async def drive(
+    *,
+    base_url: str,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    fixtures: Fixtures,
+) -> tuple[list[Sample], float]:
+    names, weights = list(mix), list(mix.values())
+    samples: list[Sample] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        async def worker() -> None:
+            while (now := time.monotonic()) < deadline:
+                scenario = random.choices(names, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    ok = await one_request(client, scenario, fixtures)
+                except httpx.HTTPError:
+                    ok = False
+                if now >= measure_from:
+                    samples.append(Sample(scenario, time.perf_counter() - t0, ok))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - measure_from
+    return samples, elapsed
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict[str, Any]:
+    def stats(group: list[Sample]) -> dict[str, Any]:
+        latencies = sorted(s.seconds for s in group)
+        return {
+            "requests": len(group),
+            "errors": sum(not s.ok for s in group),
+            "throughput_rps": len(group) / elapsed if elapsed else 0.0,
+            "latency_ms": {
+                "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                "p50": percentile(latencies, 50) * 1000,
+                "p95": percentile(latencies, 95) * 1000,
+                "p99": percentile(latencies, 99) * 1000,
+            },
+        }
+
+    by_scenario = {
+        name: stats([s for s in samples if s.scenario == name])
+        for name in SCENARIOS
+        if any(s.scenario == name for s in samples)
+    }
+    return {"total": stats(samples), "scenarios": by_scenario}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("me=8,login=1,register=0.5,verify=0.5"))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds first")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=200, help="verified seed users")
+    parser.add_argument("--unverified", type=int, default=2000, help="seed users for verify-email")
+    parser.add_argument("--smtp-connect-delay", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, default=Path("bench_output.json"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = SMTPSink(connect_delay=args.smtp_connect_delay).start()
+        port = free_port()
+        sqlite_path = str(Path(tmp) / "loadtest.sqlite") if args.db == "sqlite" else None
+        # the server and the seeding below must agree on SECRET_KEY and SMTP
+        env = {
+            **os.environ,
+            "SECRET_KEY": os.environ.get("SECRET_KEY") or uuid.uuid4().hex * 2,
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(sink.port),
+            "SMTP_TLS": "false",
+            "SMTP_SSL": "false",
+            "EMAILS_FROM_EMAIL": "loadtest@example.com",
+            # the default login/register limits would turn the mix into a 429 benchmark
+            "RATE_LIMIT_ENABLED": "false",
+            # every worker's metrics, read back for the query budgets
+            "METRICS_MULTIPROCESS_DIR": str(Path(tmp) / "metrics"),
+            "INTERNAL_API_TOKEN": uuid.uuid4().hex,
+        }
+        env.pop("SMTP_USER", None)
+        env.pop("SMTP_PASSWORD", None)
+        if sqlite_path:
+            env["LOADTEST_SQLITE_PATH"] = sqlite_path
+        os.environ.update({k: env[k] for k in ("SECRET_KEY", "SMTP_HOST", "SMTP_PORT")})
+
+        fixtures = seed(sqlite_path=sqlite_path, users=args.users, unverified=args.unverified)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.loadtest_app", "--port", str(port),
+             "--workers", str(args.workers)],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            asyncio.run(wait_until_ready(base_url, server))
+            samples, elapsed = asyncio.run(
+                drive(
+                    base_url=base_url,
+                    mix=args.mix,
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                    warmup=args.warmup,
+                    fixtures=fixtures,
+                )
+            )
+            over_budget = asyncio.run(over_budget_requests(base_url, env["INTERNAL_API_TOKEN"]))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            sink.shutdown()
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "db": args.db,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration_s": elapsed,
+            "workers": args.workers,
+            "emails_received": sink.messages,
+        },
+        "over_query_budget": over_budget,
+        **summarize(samples, elapsed),
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    total = report["total"]
+    print(
+        f"{total['requests']} requests, {total['errors']} errors, "
+        f"{total['throughput_rps']:.1f} req/s, p50={total['latency_ms']['p50']:.1f}ms "
+        f"p95={total['latency_ms']['p95']:.1f}ms p99={total['latency_ms']['p99']:.1f}ms"
+    )
+    for name, scenario in report["scenarios"].items():
+        print(
+            f"  {name:>8}: {scenario['requests']:6d} req {scenario['errors']:4d} err "
+            f"{scenario['throughput_rps']:8.1f} req/s p99={scenario['latency_ms']['p99']:.1f}ms"
+        )
+    print(f"report written to {args.output}")
+    # a scenario that mostly fails measures error responses, not the endpoint
+    broken = [
+        name for name, scenario in report["scenarios"].items()
+        if scenario["errors"] * 2 > scenario["requests"]
+    ]
+    if broken:
+        sys.exit(f"most requests failed in {', '.join(broken)}, the figures are not valid")
+    if over_budget:
+        routes = ", ".join(f"{route} ({count:.0f})" for route, count in over_budget.items())
+        sys.exit(f"requests over their query budget: {routes}, see the server log")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Entry point the load-test harness runs under uvicorn.
+
+With ``LOADTEST_SQLITE_PATH`` set every database access (the write and read
+session dependencies, the read-session and replica getters, and background
+work such as the revocation sync) goes to an aiosqlite database instead of
+Postgres; everything else is the real app.
+"""
+import argparse
+import os
+
+import uvicorn
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import db
+from app.core.instrumentation import instrument_queries
+from app.core.replicas import ReplicaSet
+from app.main import app
+from app.utils.deps import get_async_db, get_read_db
+
+if sqlite_path := os.environ.get("LOADTEST_SQLITE_PATH"):
+    _engine = create_async_engine(f"sqlite+aiosqlite:///{sqlite_path}")
+    # counted like the Postgres engine, for the metrics and the query budgets
+    instrument_queries(_engine.sync_engine)
+    _session_maker = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _get_sqlite_db():  # type: ignore[no-untyped-def]
+        async with _session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = _get_sqlite_db
+    app.dependency_overrides[get_read_db] = _get_sqlite_db
+    # code outside the request dependencies looks these up on app.core.db at call time
+    _no_replicas = ReplicaSet([], selection="round_robin", retry_after=0)
+    db.get_async_engine = lambda: _engine
+    db.get_async_session_maker = lambda: _session_maker
+    db.get_read_session_maker = lambda: _session_maker
+    db.get_replica_set = lambda: _no_replicas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run(
+        "benchmarks.loadtest_app:app",
+        host="127.0.0.1",
+        port=args.port,
+        workers=args.workers,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
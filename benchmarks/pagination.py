@@ -0,0 +1,113 @@
+"""Compare OFFSET and keyset pagination latency at increasing page depth.
+
+Runs against the configured Postgres, which must already be migrated so the
+``ix_users_created_at_id`` index exists. ``--seed`` inserts throwaway users
+first (bulk, with a fixed password hash) and runs ANALYZE so the estimated
+count has statistics to read.
+
+    python -m benchmarks.pagination --seed 200000 --size 50 --depths 1,100,1000,4000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, text
+from sqlmodel import Session, select
+
+from app.core import security
+from app.core.db import get_engine
+from app.user.models import User
+from app.utils.paginator import CursorPaginator
+
+
+def seed(count: int) -> None:
+    hashed_password = security.get_password_hash("pagination-benchmark")
+    run_id = uuid.uuid4().hex[:8]
+    start = datetime.now() - timedelta(seconds=count)
+    with Session(get_engine()) as session:
+        for offset in range(0, count, 5000):
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "email": f"page-{run_id}-{i}@example.com",
+                    "hashed_password": hashed_password,
+                    "created_at": start + timedelta(seconds=i),
+                    "is_active": True,
+                    "is_verified": True,
+                }
+                for i in range(offset, min(offset + 5000, count))
+            ]
+            session.execute(insert(User), rows)
+        session.commit()
+        session.execute(text("ANALYZE users"))
+
+
+def best_of(repeat: int, fn) -> float:  # type: ignore[no-untyped-def]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="users to insert first")
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--depths", default="1,100,1000,4000", help="page numbers to fetch")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+    depths = [int(d) for d in args.depths.split(",")]
+
+    with Session(get_engine()) as session:
+        total = session.exec(select(func.count()).select_from(User)).one()
+        print(f"{total} users, page size {args.size}")
+
+        count_exact = best_of(args.repeat, lambda: session.exec(select(func.count()).select_from(User)).one())
+        count_estimated = best_of(
+            args.repeat,
+            lambda: session.execute(
+                text("SELECT reltuples FROM pg_class WHERE relname = 'users'")
+            ).scalar(),
+        )
+        print(f"count(*): {count_exact * 1000:.2f}ms  reltuples: {count_estimated * 1000:.2f}ms")
+
+        for depth in depths:
+            skip = (depth - 1) * args.size
+            if skip >= total:
+                print(f"page {depth}: past the end, skipped")
+                continue
+            # the keyset query starts right after the last row of the previous page
+            keys = (User.created_at, User.id)
+            boundary = session.exec(
+                select(User).order_by(*keys).offset(max(skip - 1, 0)).limit(1)
+            ).first()
+            cursor = None
+            if skip:
+                cursor = CursorPaginator(keys=keys).encode_cursor(
+                    [boundary.created_at, boundary.id]
+                )
+            paginator = CursorPaginator(keys=keys, cursor=cursor, size=args.size)
+
+            offset_seconds = best_of(
+                args.repeat,
+                lambda: session.exec(
+                    select(User).order_by(*keys).offset(skip).limit(args.size)
+                ).all(),
+            )
+            keyset_seconds = best_of(
+                args.repeat, lambda: session.exec(paginator.apply(select(User))).all()
+            )
+            print(
+                f"page {depth:>6}: offset {offset_seconds * 1000:8.2f}ms  "
+                f"keyset {keyset_seconds * 1000:8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
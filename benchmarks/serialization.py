@@ -0,0 +1,89 @@
+"""Microbenchmark of response serialization for the API's models.
+
+For each model it times what FastAPI does after a route returns: validating
+against ``response_model``, converting to JSON-able Python and encoding with
+``JSONResponse``; the same with ``ORJSONResponse`` (when orjson is
+installed); and the ``ModelResponse`` path used by ``prevalidated`` routes,
+which encodes the model directly in pydantic-core.
+
+    python -m benchmarks.serialization --number 20000
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import ModelResponse
+from app.models import Message
+from app.user.models import Token, UserData, UserPublic
+from app.utils.paginator import CursorPage
+
+
+def samples() -> dict[str, tuple[type, Any]]:
+    user = UserPublic(
+        id=uuid.uuid4(),
+        email="someone@example.com",
+        created_at=datetime.now(),
+        is_active=True,
+        is_verified=True,
+    )
+    return {
+        "Message": (Message, Message(message="Password updated successfully.")),
+        "Token": (Token, Token(access_token="x" * 180)),
+        "UserData": (UserData, UserData(email="someone@example.com")),
+        "CursorPage[UserPublic] x50": (
+            CursorPage[UserPublic],
+            CursorPage[UserPublic](size=50, next_cursor="c" * 60, results=[user] * 50),
+        ),
+    }
+
+
+def run_sync(coroutine: Any) -> Any:
+    # serialize_response never suspends when is_coroutine=True
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("serialize_response suspended")
+
+
+def fastapi_path(model: type, value: Any, response_class: type[JSONResponse]) -> Callable[[], bytes]:
+    field = create_model_field(name="Response", type_=model, mode="serialization")
+
+    def run() -> bytes:
+        content = run_sync(serialize_response(field=field, response_content=value, is_coroutine=True))
+        return response_class(content).body
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    candidates: list[tuple[str, type[JSONResponse] | None]] = [("JSONResponse", JSONResponse)]
+    try:
+        from fastapi.responses import ORJSONResponse
+        import orjson  # noqa: F401
+
+        candidates.append(("ORJSONResponse", ORJSONResponse))
+    except ImportError:
+        print("orjson not installed, skipping ORJSONResponse")
+
+    for name, (model, value) in samples().items():
+        print(name)
+        for label, response_class in candidates:
+            seconds = min(timeit.repeat(fastapi_path(model, value, response_class), number=args.number, repeat=3))
+            print(f"  validate + {label:<15} {seconds / args.number * 1e6:8.2f} us")
+        seconds = min(timeit.repeat(lambda: ModelResponse(value).body, number=args.number, repeat=3))
+        print(f"  prevalidated ModelResponse  {seconds / args.number * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
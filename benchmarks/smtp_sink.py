@@ -0,0 +1,81 @@
+"""Minimal threaded SMTP server that accepts and discards every message.
+
+It stands in for a real relay in benchmarks and load tests. ``connect_delay``
+simulates the cost of the TCP/TLS/auth handshake a real relay charges per
+connection.
+
+    python -m benchmarks.smtp_sink --port 8025 --connect-delay 0.05
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "SMTPSink"
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+        with self.server.lock:
+            self.server.connections += 1
+        self._reply("220 sink ESMTP")
+        while line := self.rfile.readline():
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-sink")
+                self._reply("250 8BITMIME")
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while (data := self.rfile.readline()) and data.rstrip(b"\r\n") != b".":
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 OK queued")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0):
+        super().__init__((host, port), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    with SMTPSink(args.host, args.port, args.connect_delay) as sink:
+        print(f"SMTP sink listening on {args.host}:{sink.port}")
+        sink.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare per-message SMTP connections with the pooled transport.
+
+Sends the same messages to a local SMTP sink three ways: one connection per
+email (the old ``send_email`` behaviour), ``send_email`` through the pool, and
+``send_many`` over a single pooled connection.
+
+    python -m benchmarks.smtp_throughput --messages 500 --connect-delay 0.02
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import emails  # type: ignore
+
+from app.core.config import settings
+from app.utils import Emailhandler
+from app.utils.Emailhandler import EmailData
+from benchmarks.smtp_sink import SMTPSink
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--connect-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    sink = SMTPSink(connect_delay=args.connect_delay).start()
+    settings.SMTP_HOST = "127.0.0.1"
+    settings.SMTP_PORT = sink.port
+    settings.SMTP_TLS = settings.SMTP_SSL = False
+    settings.SMTP_USER = settings.SMTP_PASSWORD = None
+    settings.EMAILS_FROM_EMAIL = settings.EMAILS_FROM_EMAIL or "bench@example.com"
+    settings.SMTP_POOL_SIZE = args.threads
+
+    email_data = EmailData(subject="benchmark", html_content="<p>hello</p>")
+    recipients = [f"user{i}@example.com" for i in range(args.messages)]
+
+    def unpooled(email_to: str) -> None:
+        message = emails.Message(
+            subject=email_data.subject,
+            html=email_data.html_content,
+            mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+        )
+        options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
+        assert message.send(to=email_to, smtp=options).success
+
+    def pooled(email_to: str) -> None:
+        assert Emailhandler.send_email(
+            email_to=email_to,
+            subject=email_data.subject,
+            html_content=email_data.html_content,
+        ).success
+
+    def batched() -> None:
+        chunk = max(len(recipients) // args.threads, 1)
+        batches = [recipients[i : i + chunk] for i in range(0, len(recipients), chunk)]
+        with ThreadPoolExecutor(args.threads) as executor:
+            for responses in executor.map(
+                lambda batch: Emailhandler.send_many(
+                    messages=[(email_to, email_data) for email_to in batch]
+                ),
+                batches,
+            ):
+                assert all(r.success for r in responses)
+
+    def timed(name: str, run) -> None:  # type: ignore[no-untyped-def]
+        connections = sink.connections
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>10}: {args.messages / elapsed:8.1f} msg/s "
+            f"connections={sink.connections - connections}"
+        )
+
+    with ThreadPoolExecutor(args.threads) as executor:
+        timed("unpooled", lambda: list(executor.map(unpooled, recipients)))
+        timed("pooled", lambda: list(executor.map(pooled, recipients)))
+    timed("send_many", batched)
+    Emailhandler.get_smtp_pool().close()
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Worker startup time and an import-time budget for ``app.main``.
+
+Each run imports the app in a fresh interpreter with ``-X importtime``, then
+optionally runs the lifespan startup. It reports the median wall time and the
+slowest modules. It exits non-zero when the median import exceeds
+``--budget-ms`` or when a module that should load lazily was imported eagerly.
+The second half also runs on its own, in the Docker build, as
+``python -m app.check_lazy_imports``.
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1500 --lifespan
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from app.check_lazy_imports import LAZY_MODULES
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+eager = [m for m in {lazy!r} if m in sys.modules]
+lifespan = None
+if {lifespan!r}:
+    import asyncio
+
+    async def run():
+        async with app.main.app.router.lifespan_context(app.main.app):
+            pass
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    lifespan = time.perf_counter() - started
+print(json.dumps({{
+    "import": imported,
+    "lifespan": lifespan,
+    "eager": eager,
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every line of -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            # the header line
+            continue
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def probe(lifespan: bool) -> tuple[dict, list[tuple[str, int, int]]]:
+    code = _PROBE.format(lifespan=lifespan, lazy=LAZY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=os.environ.copy(), check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--lifespan", action="store_true", help="also time the lifespan startup")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # the first run warms the bytecode cache and is not counted
+    probe(lifespan=False)
+    results, modules = [], []
+    for _ in range(args.runs):
+        result, modules = probe(args.lifespan)
+        results.append(result)
+
+    import_ms = statistics.median(r["import"] for r in results) * 1000
+    print(f"import app.main: median {import_ms:.0f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+    if args.lifespan:
+        lifespan_ms = statistics.median(r["lifespan"] for r in results) * 1000
+        print(f"lifespan startup: median {lifespan_ms:.0f}ms")
+    print("slowest modules by self time (last run):")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[1], reverse=True)[: args.top]:
+        print(f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms cumulative  {name}")
+
+    failed = False
+    eager = results[-1]["eager"]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f"FAIL: import took {import_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()